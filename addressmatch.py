@@ -0,0 +1,99 @@
+import numpy as np
+from arrayfile import savearrays, loadarrays
+from profiling import profiled
+
+
+def addressids(keys):
+  '''Numbers the distinct addresses of each neuron of an n x neurons array.
+
+  Returns an n x neurons int32 array in which two vertices get the same id
+  for a neuron exactly when their addresses for it are equal, whatever
+  the width of the address keys.
+  '''
+  ids = np.empty(keys.shape, dtype=np.int32)
+  for neuron in xrange(keys.shape[1]):
+    ids[:, neuron] = np.unique(keys[:, neuron], return_inverse=True)[1]
+  return ids
+
+
+class AddressMatcher(object):
+  '''Scores vertex pairs by how many neuron addresses they share.
+
+  A discriminator trained on u's addresses answers v's with how many of
+  their neuron addresses are equal, and so does the one trained on v's, so
+  pair (u, v) scores twice that number, as testPair(g, u, v, deg,
+  store=store) does. The addresses are compared as int32 ids, rows x cols
+  x neuronblock at a time so every block stays in cache, and no
+  discriminator is ever built. The ids can be saved once and memory-mapped
+  by every process scoring pairs, which then never reads the store.
+
+  Attributes:
+    ids: the n x neurons address ids of the store (see addressids).
+    neuronblock: how many neurons are compared at a time.
+    meta: the meta dict of the SignatureStore the ids were taken from.
+  '''
+
+  def __init__(self, ids, neuronblock=64, meta=None):
+    self.ids = ids
+    self.neuronblock = neuronblock
+    self.meta = meta or {}
+
+  @classmethod
+  def fromstore(cls, store, path=None, neuronblock=64):
+    '''Numbers the addresses of a SignatureStore.
+
+    When a path is given, the ids are saved there and memory-mapped back.
+    '''
+    ids = addressids(store.keys)
+    if path is None:
+      return cls(ids, neuronblock, store.meta)
+    savearrays(path, {"ids": ids}, store.meta)
+    return cls.load(path, neuronblock)
+
+  @classmethod
+  def load(cls, path, neuronblock=64):
+    '''Memory-maps the ids saved at path.'''
+    arrays, meta = loadarrays(path)
+    return cls(arrays["ids"], neuronblock, meta)
+
+  def __len__(self):
+    return len(self.ids)
+
+  @profiled("wisard.answer")
+  def scores(self, rows, cols):
+    '''Returns the len(rows) x len(cols) matrix of the pair scores.'''
+    a = self.ids[rows]
+    b = self.ids[cols]
+    matches = np.zeros((len(a), len(b)), dtype=np.int32)
+    for start in xrange(0, self.ids.shape[1], self.neuronblock):
+      end = start + self.neuronblock
+      matches += (a[:, None, start:end] == b[None, :, start:end]).sum(
+          axis=2, dtype=np.int32)
+    return 2 * matches
+
+  def row(self, u):
+    '''Returns the scores of the pairs (u, v), v > u, in the order of v.'''
+    return self.scores([u], np.arange(u+1, len(self)))[0]
+
+  def rankpairs(self, rank, blocksize=256):
+    '''Offers every pair (u, v), u < v, with its score to a TopRank.
+
+    The pairs are scored blocksize x blocksize at a time and only the best
+    rank.k pairs of each block are offered, which leaves the rank as if
+    every pair had been.
+    '''
+    n = len(self)
+    if rank.k <= 0:
+      return
+    for top in xrange(0, n, blocksize):
+      rows = np.arange(top, min(top + blocksize, n))
+      for left in xrange(top, n, blocksize):
+        cols = np.arange(left, min(left + blocksize, n))
+        us, vs = np.meshgrid(rows, cols, indexing="ij")
+        scores = self.scores(rows, cols)
+        keep = us < vs
+        us, vs, scores = us[keep], vs[keep], scores[keep]
+        # ties go to the lowest (u, v), as in TopRank
+        best = np.lexsort((-vs, -us, scores))[-rank.k:]
+        rank.extend(zip(scores[best].tolist(), us[best].tolist(),
+                        vs[best].tolist()))
@@ -0,0 +1,52 @@
+import json
+import struct
+import numpy as np
+
+MAGIC = "LPSNAP1\n"
+ALIGNMENT = 64
+
+
+def savearrays(path, arrays, meta=None):
+  '''Saves named arrays, raw and 64 bytes aligned, into a single file.
+
+  The file starts with a JSON header giving each array's dtype, shape and
+  offset, along with the meta dict, so loadarrays can memory-map them.
+  '''
+  arrays = dict((name, np.ascontiguousarray(a)) for name, a in arrays.items())
+  layout = {}
+  offset = 0
+  for name in sorted(arrays):
+    layout[name] = {"dtype": arrays[name].dtype.str,
+                    "shape": list(arrays[name].shape), "offset": offset}
+    offset += -(-arrays[name].nbytes // ALIGNMENT) * ALIGNMENT
+  header = json.dumps({"arrays": layout, "meta": meta or {}})
+  start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+  with open(path, "wb") as f:
+    f.write(MAGIC)
+    f.write(struct.pack("<Q", start))
+    f.write(header)
+    for name in sorted(arrays):
+      f.seek(start + layout[name]["offset"])
+      f.write(arrays[name].tostring())
+    f.truncate(start + offset)
+
+def loadarrays(path, mode="r"):
+  '''Memory-maps the arrays saved by savearrays.
+
+  Returns the dict of arrays and the meta dict. Nothing is read until the
+  arrays are accessed.
+  '''
+  with open(path, "rb") as f:
+    if f.read(len(MAGIC)) != MAGIC:
+      raise ValueError("%s is not an array snapshot" % path)
+    start, = struct.unpack("<Q", f.read(8))
+    header = json.loads(f.read(start - len(MAGIC) - 8).rstrip("\0"))
+  arrays = {}
+  for name, layout in header["arrays"].items():
+    shape = tuple(layout["shape"])
+    if not np.prod(shape):
+      arrays[name] = np.zeros(shape, dtype=layout["dtype"])
+      continue
+    arrays[name] = np.memmap(path, dtype=layout["dtype"], mode=mode,
+                             offset=start + layout["offset"], shape=shape)
+  return arrays, header["meta"]
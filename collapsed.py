@@ -0,0 +1,53 @@
+import numpy as np
+from graphbuild import buildgraph
+from graphmatrices import edgearrays, decayweights
+
+# the edge properties a collapsed graph carries, with their value types
+EDGEPROPERTIES = (("multiplicity", "int"), ("minyear", "int"),
+                  ("maxyear", "int"), ("weight", "double"))
+
+
+def iscollapsed(g):
+  return "multiplicity" in g.edge_properties
+
+def collapsegraph(g, lastyear):
+  '''Returns g with each bundle of parallel edges collapsed into one edge.
+
+  The vertices, and their "index" property, stay as they are. Each edge
+  stands for all of g's edges between its endpoints and carries:
+    multiplicity: how many edges it stands for.
+    minyear, maxyear: the lowest and highest of their "age".
+    weight: the sum of their 1/(lastyear-age+1) decay weights.
+  lastyear is kept as a graph property, since weight only holds for it.
+  Scorers read a neighbour's multiplicity and weight off a single edge
+  instead of walking every parallel one.
+  '''
+  sources, targets, indexes = edgearrays(g)
+  ages = g.edge_properties["age"].a[indexes].astype(np.int64)
+  n = g.num_vertices()
+  low = np.minimum(sources, targets).astype(np.int64)
+  high = np.maximum(sources, targets).astype(np.int64)
+  order = np.lexsort((ages, low * n + high))
+  low, high, ages = low[order], high[order], ages[order]
+  starts = np.flatnonzero(np.concatenate(
+      ([True], (low[1:] != low[:-1]) | (high[1:] != high[:-1]))))
+  ends = np.concatenate((starts[1:], [len(ages)]))
+  if len(ages) == 0:
+    starts = ends = np.zeros(0, dtype=np.int64)
+  h = buildgraph(low[starts], high[starts], n=n)
+  values = {"multiplicity": ends - starts,
+            "minyear": ages[starts],
+            "maxyear": ages[ends - 1],
+            "weight": np.add.reduceat(decayweights(ages, lastyear), starts)
+                      if len(starts) else np.zeros(0)}
+  for name, valuetype in EDGEPROPERTIES:
+    prop = h.new_edge_property(valuetype)
+    prop.a[:] = values[name]
+    h.edge_properties[name] = prop
+  h.graph_properties["lastyear"] = h.new_graph_property("int")
+  h.graph_properties["lastyear"] = lastyear
+  if "index" in g.vertex_properties:
+    index = h.new_vertex_property("int")
+    index.a[:] = g.vertex_properties["index"].a[:n]
+    h.vertex_properties["index"] = index
+  return h
@@ -0,0 +1,43 @@
+import numpy as np
+from graphmatrices import multiplicitymatrix, neighbours
+from profiling import profiled
+
+
+@profiled("pruning")
+def corenumbers(g):
+  '''Returns the core number of every vertex of g.
+
+  Vertex v belongs to the k-core, the largest subgraph in which every
+  vertex has at least k edges, for every k up to corenumbers(g)[v].
+  Parallel edges count once each, as in v.out_degree(). Vertices are
+  peeled a whole frontier at a time and each removed vertex's row is read
+  once, so the work is O(n + m) plus an O(n) scan per core level.
+  '''
+  m = multiplicitymatrix(g)
+  multiplicities = m.data.astype(np.int64)
+  degrees = np.asarray(m.sum(axis=1)).ravel().astype(np.int64)
+  cores = np.zeros(len(degrees), dtype=np.int32)
+  alive = np.ones(len(degrees), dtype=bool)
+  k = 0
+  while alive.any():
+    k = max(k, degrees[alive].min())
+    frontier = np.flatnonzero(alive & (degrees <= k))
+    while len(frontier):
+      cores[frontier] = k
+      alive[frontier] = False
+      touched = neighbours(m.indptr, m.indices, frontier)
+      np.subtract.at(degrees, touched,
+                     neighbours(m.indptr, multiplicities, frontier))
+      touched = np.unique(touched)
+      frontier = touched[alive[touched] & (degrees[touched] <= k)]
+  return cores
+
+def kcore(g, k):
+  '''Returns the vertex filter of g's k-core.
+
+  Keeping it leaves the vertices with at least k edges among the kept
+  ones, the fixed point preparegraph.minimumdegree used to loop towards.
+  '''
+  keep = g.new_vertex_property("bool")
+  keep.a[:] = corenumbers(g) >= k
+  return keep
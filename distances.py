@@ -0,0 +1,68 @@
+import numpy as np
+from graphmatrices import multiplicitymatrix, neighbours
+
+
+class DistanceRows(object):
+  '''Single source distances of a graph, found with truncated BFS runs.
+
+  A single BFS per source replaces the per pair shortest_distance calls.
+  It stops maxdistance hops away from the source, so its cost is bound by
+  the vertices within reach instead of the whole graph.
+
+  Attributes:
+    indptr, indices: the CSR adjacency of the graph.
+    maxdistance: how many hops the searches go.
+  '''
+
+  def __init__(self, g, maxdistance):
+    adjacency = multiplicitymatrix(g)
+    self.indptr = adjacency.indptr
+    self.indices = adjacency.indices
+    self.maxdistance = maxdistance
+    self.seen = np.zeros(g.num_vertices(), dtype=bool)
+
+  def reach(self, source):
+    '''Returns the vertices at most maxdistance hops away and their distances.
+
+    Both arrays are sorted by distance, the source coming first.
+    '''
+    frontier = np.array([int(source)], dtype=self.indices.dtype)
+    vertices, distances = [frontier], [np.zeros(1, dtype=np.int32)]
+    self.seen[frontier] = True
+    for distance in xrange(1, self.maxdistance + 1):
+      reached = np.unique(neighbours(self.indptr, self.indices, frontier))
+      frontier = reached[~self.seen[reached]]
+      if not len(frontier):
+        break
+      self.seen[frontier] = True
+      vertices.append(frontier)
+      distances.append(np.repeat(np.int32(distance), len(frontier)))
+    vertices = np.concatenate(vertices)
+    # only the reached entries are cleared, keeping the search O(reach)
+    self.seen[vertices] = False
+    return vertices, np.concatenate(distances)
+
+  def row(self, source):
+    '''Returns the distances from source to every vertex.
+
+    Vertices further than maxdistance hops, or unreachable, get -1.
+    '''
+    row = np.repeat(np.int32(-1), len(self.seen))
+    vertices, distances = self.reach(source)
+    row[vertices] = distances
+    return row
+
+  def candidates(self, source, mindistance=2, after=True):
+    '''Returns the targets between mindistance and maxdistance hops away.
+
+    The (targets, distances) arrays returned are sorted by target. When
+    after is set, only targets with a higher index than source are kept, as
+    the u < v pair loops want.
+    '''
+    vertices, distances = self.reach(source)
+    keep = distances >= mindistance
+    if after:
+      keep &= vertices > int(source)
+    vertices, distances = vertices[keep], distances[keep]
+    order = np.argsort(vertices)
+    return vertices[order], distances[order]
@@ -3,6 +3,7 @@ from itertools import repeat, izip
 import math
 from random import sample, shuffle
 import warnings
+import numpy as np
 
 
 class DataEncoder(object):
@@ -61,6 +62,62 @@ class BitStringEncoder(DataEncoder):
         return [int(bits[i::self.nmbr_neurons], 2)
                 for i in xrange(self.nmbr_neurons)]
 
+    def map_positions(self, positions, length):
+        '''Maps a bit string given by the positions of its set bits.
+
+        The addresses are the same __call__ returns for the bit string of the
+        given length whose set bits are at the given positions, but neither
+        the string nor its mapped copy is built: each set bit is sent
+        straight to its neuron and address bit. This costs O(len(positions))
+        instead of O(length), once the mapping is defined.
+
+        Returns:
+            Considering the mapping of the __call__ example,
+            BitStringEncoder(2).map_positions([0, 1, 2, 3, 7], 8) = [10, 11].
+        '''
+
+        if self.nmbr_neurons == 1:
+            return sum(1 << (length - 1 - int(p)) for p in positions)
+
+        if not self.mapping:
+            self.mapping = range(length)
+            shuffle(self.mapping)
+
+        n = self.nmbr_neurons
+        reverse_mapping = self.get_reverse_mapping()
+        addresses = [0] * n
+
+        for p in positions:
+            q = reverse_mapping[p]
+            # q is the (q / n)-th bit of neuron q % n, counting from the left
+            i = q % n
+            addresses[i] |= 1 << ((length - i - 1) / n - q / n)
+
+        return addresses
+
+    def address_bits(self, length):
+        '''Returns the bit length of the widest address of a mapped string.
+
+        Considering bit strings of the given length, the first neurons get
+        the longest addresses, as they take the leftover bits.
+        '''
+
+        if self.nmbr_neurons == 1:
+            return length
+
+        return (length - 1) / self.nmbr_neurons + 1
+
+    def get_reverse_mapping(self):
+        '''Returns the list giving the mapped position of each bit.'''
+
+        if not self.reverse_mapping:
+            self.reverse_mapping = [0] * len(self.mapping)
+
+            for i, j in enumerate(self.mapping):
+                self.reverse_mapping[j] = i
+
+        return self.reverse_mapping
+
     def unmap(self, addresses):
         if self.nmbr_neurons == 1:
             s = bin(addresses)[2:]
@@ -82,13 +139,36 @@ class BitStringEncoder(DataEncoder):
         if plus_one_lim: min_addr_len += 1
         bits = ''.join(bits[i::min_addr_len] for i in xrange(min_addr_len))
 
-        if not self.reverse_mapping:
-            self.reverse_mapping = [0] * len(self.mapping)
+        return ''.join(bits[x] for x in self.get_reverse_mapping())
+
+
+def address_keys(addresses, words=1):
+    '''Packs int addresses into fixed size keys, in an array of their shape.
+
+    With a single word the keys are uint64; otherwise each key holds the
+    given number of little-endian 64 bits words as a numpy void. Equal
+    addresses give equal keys, so keys can be compared, sorted and searched
+    in place of the addresses, though not ordered as numbers.
+    '''
+
+    addresses = np.asarray(addresses, dtype=object)
+    flat = addresses.ravel()
+    packed = np.empty((len(flat), words), dtype=np.uint64)
+    mask = (1 << 64) - 1
+
+    for w in xrange(words):
+        packed[:, w] = [(int(a) >> 64 * w) & mask for a in flat]
+
+    return key_view(packed).reshape(addresses.shape)
 
-            for i, j in enumerate(self.mapping):
-                self.reverse_mapping[j] = i
 
-        return ''.join(bits[x] for x in self.reverse_mapping)
+def key_view(words):
+    '''Views an array of 64 bits words, along its last axis, as keys.'''
 
+    words = np.ascontiguousarray(words, dtype=np.uint64)
 
+    if words.shape[-1] == 1:
+        return words[..., 0]
 
+    keys = words.view(np.dtype((np.void, 8 * words.shape[-1])))
+    return keys[..., 0]
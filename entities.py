@@ -0,0 +1,195 @@
+import multiprocessing
+import re
+
+# the replacements recode.py has always made, in the order it makes them
+RULES = [
+  ('&uuml;', 'u'),
+  ('&auml;', 'a'),
+  ('&ouml;', 'o'),
+  ('&amp;', 'et'),
+  ('&szlig;', 'ss'),
+  ('&Auml;', 'A'),
+  ('&Ouml;', 'O'),
+  ('&Uuml;', 'U'),
+  ('&Aacute;', 'A'),
+  ('&Agrave;', 'A'),
+  ('&aacute;', 'a'),
+  ('&agrave;', 'a'),
+  ('&egrave;', 'e'),
+  ('&ograve;', 'o'),
+  ('&igrave;', 'i'),
+  ('&Eacute;', 'E'),
+  ('&eacute;', 'e'),
+  ('&Iacute;', 'I'),
+  ('&iacute;', 'i'),
+  ('&Oacute;', 'O'),
+  ('&oacute;', 'o'),
+  ('&Uacute;', 'U'),
+  ('&uacute;', 'u'),
+  ('&Oslash;', 'O'),
+  ('&oslash;', 'o'),
+  ('&micro;', 'u'),
+  ('&#091;', 'o'),
+  ('&#093;', 'o'),
+  ('&#956;', 'o'),
+  ('&#246;', 'o'),
+  ('&#937;', 'o'),
+  ('&#703;', 'o'),
+  ('&#949;', 'o'),
+  ('&#945;', 'o'),
+  ('&#945;', 'o'),
+  ('&#956;', 'o'),
+  ('&#960;', 'o'),
+  ('&#8242;', 'o'),
+  ('&#402;', 'o'),
+  ('&#923;', 'o'),
+  ('&#981;', 'o'),
+  ('&#176;', 'o'),
+  ('&#174;', 'o'),
+  ('&#954;', 'o'),
+  ('&#8201;', 'o'),
+  ('&#191;', 'o'),
+  ('&#931;', 'o'),
+  ('&#916;', 'o'),
+  ('&#8467;', 'o'),
+  ('&#8477;', 'o'),
+  ('&#948;', 'o'),
+  ('&#963;', 'o'),
+  ('&#8734;', 'o'),
+  ('&#8727;', 'o'),
+  ('&#936;', 'o'),
+  ('&#', 'o'),
+  ('&aelig;', 'ae'),
+  ('&yacute;', 'y'),
+  ('&Ccedil;', 'C'),
+  ('&ccedil;', 'c'),
+  ('&ntilde;', 'n'),
+  ('&atilde;', 'a'),
+  ('&acirc;', 'a'),
+  ('&aring;', 'a'),
+  ('&Aring;', 'A'),
+  ('&ETH;', 'E'),
+  ('&euml;', 'e'),
+  ('&yuml;', 'y'),
+  ('&ecirc;', 'e'),
+  ('&icirc;', 'i'),
+  ('&ocirc;', 'o'),
+  ('&iuml;', 'i'),
+  ('&eth;', 'e'),
+  ('&otilde;', 'o'),
+  ('&times;', 'x'),
+  ('&reg;', 'R'),
+  ('&gt;', 'o'),
+  ('&lt;', 'o'),
+]
+
+PATTERNS = dict(RULES)
+# at any '&', the first rule in RULES order matching there wins
+ENTITY = re.compile('|'.join(re.escape(pattern) for pattern, _ in RULES))
+# text between an '&' and the next one which some rule could still match
+# past the second '&', once it is replaced; see cascades
+PREFIXES = frozenset(pattern[:i] for pattern, _ in RULES
+                     for i in xrange(1, len(pattern)))
+NEARBY = re.compile('&(?=[^&\n]{0,%d}&)' % (max(len(p) for p, _ in RULES) - 2))
+
+
+def replaceentity(match):
+  return PATTERNS[match.group(0)]
+
+def chained(line):
+  '''Applies the rules one after the other, as recode.py always did.'''
+  for pattern, replacement in RULES:
+    line = line.replace(pattern, replacement)
+  return line
+
+def cascades(text):
+  '''Returns whether a replacement could make a later rule match in text.
+
+  Replacements hold no '&', so an earlier rule can only change what a later
+  one matches when the later match would span another '&' of the text.
+  That needs an '&' whose text up to the next '&' starts some pattern.
+  '''
+  for match in NEARBY.finditer(text):
+    start = match.start()
+    if text[start:text.index('&', start + 1)] in PREFIXES:
+      return True
+  return False
+
+def normalizeline(line):
+  if cascades(line):
+    return chained(line)
+  return ENTITY.sub(replaceentity, line)
+
+def normalize(text):
+  '''Resolves the entities of a text made of whole lines in one scan.
+
+  The output is byte-identical to recode.py's. All entities are found by a
+  single regular expression whose alternatives keep recode.py's order; the
+  rare lines where its chained replaces could interact (e.g. '&&amp;h;',
+  which recode.py turns into 'e') go through the chained replaces.
+  '''
+  if not cascades(text):
+    return ENTITY.sub(replaceentity, text)
+  return ''.join(normalizeline(line) for line in text.splitlines(True))
+
+
+class EntityFilter(object):
+  '''A read-only file normalizing the entities of another one on the fly.
+
+  It can be handed straight to a parser (e.g. ET.iterparse), so no
+  normalized copy of the file ever needs to be written.
+  '''
+
+  def __init__(self, source, chunksize=1 << 20):
+    self.source = open(source, "rb") if isinstance(source, basestring) else source
+    self.chunksize = chunksize
+    self.buffer = ''
+
+  def read(self, size=-1):
+    chunks = [self.buffer]
+    length = len(self.buffer)
+    while size < 0 or length < size:
+      lines = self.source.readlines(self.chunksize)
+      if not lines:
+        break
+      chunk = normalize(''.join(lines))
+      chunks.append(chunk)
+      length += len(chunk)
+    data = ''.join(chunks)
+    if size < 0:
+      size = len(data)
+    self.buffer = data[size:]
+    return data[:size]
+
+  def close(self):
+    self.source.close()
+
+def chunks(source, chunksize):
+  while True:
+    lines = source.readlines(chunksize)
+    if not lines:
+      break
+    yield ''.join(lines)
+
+def normalizefile(source, destination, processes=1, chunksize=16 << 20):
+  '''Writes the normalized copy of the source file to destination.
+
+  With more than one process, chunks of about chunksize bytes of whole
+  lines are normalized in parallel and written back in order.
+  '''
+  fin = open(source, "rb")
+  fout = open(destination, "wb")
+  try:
+    if processes == 1:
+      for chunk in chunks(fin, chunksize):
+        fout.write(normalize(chunk))
+    else:
+      pool = multiprocessing.Pool(processes)
+      try:
+        for chunk in pool.imap(normalize, chunks(fin, chunksize)):
+          fout.write(chunk)
+      finally:
+        pool.terminate()
+  finally:
+    fin.close()
+    fout.close()
@@ -0,0 +1,103 @@
+import numpy as np
+from scipy.stats import rankdata
+from graphmatrices import edgearrays
+from profiling import profiled
+
+
+def pairkeys(us, vs, n):
+  '''Returns the int64 key min(u, v)*n + max(u, v) of each (u, v) pair.'''
+  us = np.asarray(us, dtype=np.int64)
+  vs = np.asarray(vs, dtype=np.int64)
+  return np.minimum(us, vs) * n + np.maximum(us, vs)
+
+def edgekeys(g, n=None):
+  '''Returns the sorted keys of g's edges, once per parallel edge.
+
+  The edges of a collapsed g are repeated by their "multiplicity". n must
+  be the vertex count the queried keys are made with, g's own by default.
+  '''
+  sources, targets, indexes = edgearrays(g)
+  keys = pairkeys(sources, targets, n or g.num_vertices())
+  if "multiplicity" in g.edge_properties:
+    keys = np.repeat(keys, g.edge_properties["multiplicity"].a[indexes])
+  keys.sort()
+  return keys
+
+def counts(keys, query):
+  '''Returns how many times each query key shows up in the sorted keys.'''
+  return (np.searchsorted(keys, query, side="right") -
+          np.searchsorted(keys, query, side="left"))
+
+def predictions(rank, k=None):
+  '''Returns the (scores, us, vs) arrays of the k best predictions, best first.
+
+  rank is either a TopRank or an array of batchscoring.rankdtype records
+  already sorted best first.
+  '''
+  if hasattr(rank, "ranked"):
+    ranked = np.array(rank.ranked(), dtype=np.float64).reshape(-1, 3)[:k]
+    return (ranked[:, 0], ranked[:, 1].astype(np.int64),
+            ranked[:, 2].astype(np.int64))
+  rank = rank[:k]
+  return rank["score"], rank["u"], rank["v"]
+
+def rankauc(scores, hits):
+  '''Returns the probability a hit outscores a miss, ties counting half.
+
+  This is the Mann-Whitney U statistic over the given pairs, normalized;
+  it is nan when the pairs are all hits or all misses. Given the top-k
+  predictions, it only tells how well the hits are ordered among them:
+  it is not the usual link prediction AUC of the test edges against all
+  the unlinked candidate pairs, most of which never made it to the list.
+  '''
+  positives = np.count_nonzero(hits)
+  negatives = len(hits) - positives
+  if not positives or not negatives:
+    return float("nan")
+  ranks = rankdata(scores)
+  u = ranks[hits].sum() - positives * (positives + 1) / 2.0
+  return u / (float(positives) * negatives)
+
+def randomhits(testkeys, n, count, vertices=None, seed=None):
+  '''Returns how many of count uniformly drawn pairs are test edges.
+
+  The pairs are drawn among the first vertices vertices, all n by default,
+  and keyed with n as the test keys were.
+  '''
+  pairs = np.random.RandomState(seed).randint(0, vertices or n,
+                                              size=(2, count))
+  return np.count_nonzero(counts(testkeys, pairkeys(pairs[0], pairs[1], n)))
+
+@profiled("evaluation")
+def evaluate(rank, gtest, gtrain=None, k=None, seed=None):
+  '''Scores the predictions of rank against the edges of gtest.
+
+  The first k predictions are checked, gtest's edge count by default, in
+  one pass over the sorted edge keys of both graphs; no per pair graph
+  lookups are made. Vertices are matched by index between the graphs.
+
+  Returns a dict holding the attempts, the hits, the predicted pairs that
+  already have edges in gtrain (counting parallel edges), gtest's edge
+  count, precision@k, the rankauc of the hits within the checked
+  predictions and the hits of as many random pairs.
+  '''
+  n = gtest.num_vertices()
+  if gtrain is not None:
+    n = max(n, gtrain.num_vertices())
+  totaledges = gtest.num_edges()
+  scores, us, vs = predictions(rank, totaledges if k is None else k)
+  keys = pairkeys(us, vs, n)
+  testkeys = edgekeys(gtest, n)
+  hits = counts(testkeys, keys) > 0
+  existing = 0
+  if gtrain is not None:
+    existing = int(counts(edgekeys(gtrain, n), keys).sum())
+  attempts = len(keys)
+  return {"attempts": attempts,
+          "hits": int(np.count_nonzero(hits)),
+          "existing": existing,
+          "totaledges": totaledges,
+          "precision": np.count_nonzero(hits) / float(attempts or 1),
+          "rankauc": rankauc(scores, hits),
+          "randomhits": int(randomhits(testkeys, n, attempts,
+                                        gtest.num_vertices(), seed))}
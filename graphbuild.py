@@ -0,0 +1,26 @@
+import numpy as np
+from graph_tool.all import Graph
+
+
+def buildgraph(sources, targets, years=None, n=None, directed=False):
+  '''Returns the graph with the given (source, target) edges.
+
+  All the edges are added with a single add_edge_list call, so the i-th
+  edge gets index i and its "age" edge property, when years are given, is
+  set through the property array in one assignment. Parallel edges are
+  kept apart, each one with its own year. The graph gets n vertices, or
+  just enough for the edges when n is not given. It is undirected unless
+  directed is set.
+  '''
+  sources = np.asarray(sources, dtype=np.int64)
+  targets = np.asarray(targets, dtype=np.int64)
+  if n is None:
+    n = int(max(sources.max(), targets.max())) + 1 if len(sources) else 0
+  g = Graph(directed=directed)
+  g.add_vertex(n)
+  g.add_edge_list(np.column_stack((sources, targets)))
+  if years is not None:
+    ages = g.new_edge_property("int")
+    ages.a[:] = years
+    g.edge_properties["age"] = ages
+  return g
@@ -0,0 +1,80 @@
+import numpy as np
+from scipy import sparse
+
+
+def edgearrays(g):
+  '''Returns the (sources, targets, edge indexes) arrays of g's edges.
+
+  The edge indexes address the arrays of edge property maps (e.g.
+  g.edge_properties["age"].a), so they can be used to read properties in
+  the same order as the returned endpoints.
+  '''
+  edges = g.get_edges()
+  if edges.shape[1] < 3:
+    edges = g.get_edges([g.edge_index])
+  return edges[:, 0], edges[:, 1], edges[:, 2]
+
+def decayweights(ages, lastyear):
+  '''Returns the 1/(lastyear-age+1) weight of each given edge age.'''
+  return 1.0 / (lastyear - np.asarray(ages, dtype=np.float64) + 1.0)
+
+def symmetricmatrix(sources, targets, values, n):
+  '''Returns the symmetric n x n CSR matrix holding values on both ways.
+
+  Values given for repeated (source, target) pairs are summed, so parallel
+  edges end up as a single entry.
+  '''
+  rows = np.concatenate((sources, targets))
+  cols = np.concatenate((targets, sources))
+  data = np.concatenate((values, values))
+  m = sparse.coo_matrix((data, (rows, cols)), shape=(n, n)).tocsr()
+  m.sum_duplicates()
+  return m
+
+def multiplicitymatrix(g):
+  '''Returns the CSR matrix counting the parallel edges between vertices.
+
+  Entry (u, v) is how many times v shows up in u.all_neighbours(), or the
+  "multiplicity" of the edge between them when g is collapsed (see
+  collapsed.collapsegraph).
+  '''
+  sources, targets, indexes = edgearrays(g)
+  if "multiplicity" in g.edge_properties:
+    values = g.edge_properties["multiplicity"].a[indexes].astype(np.float64)
+  else:
+    values = np.ones(len(sources), dtype=np.float64)
+  return symmetricmatrix(sources, targets, values, g.num_vertices())
+
+def decaymatrix(g, lastyear):
+  '''Returns the CSR matrix of summed edge weights between vertices.
+
+  Entry (u, v) is the sum of 1/(lastyear-age+1) over the edges between u
+  and v, as countweightedpaths adds it up for each hop. A collapsed g
+  already holds those sums as its "weight" edge property, which is only
+  valid for the lastyear it was collapsed for.
+  '''
+  sources, targets, indexes = edgearrays(g)
+  if "weight" in g.edge_properties:
+    if g.graph_properties["lastyear"] != lastyear:
+      raise ValueError("graph weights are for %d, not %d" %
+                       (g.graph_properties["lastyear"], lastyear))
+    weights = g.edge_properties["weight"].a[indexes]
+  else:
+    weights = decayweights(g.edge_properties["age"].a[indexes], lastyear)
+  return symmetricmatrix(sources, targets, weights, g.num_vertices())
+
+def neighbours(indptr, indices, frontier):
+  '''Returns the concatenated CSR rows of the frontier vertices.
+
+  The result holds each neighbour of a frontier vertex once per entry in
+  its row, without any Python loop over the frontier.
+  '''
+  starts = indptr[frontier]
+  lengths = indptr[np.asarray(frontier) + 1] - starts
+  total = lengths.sum()
+  if total == 0:
+    return np.zeros(0, dtype=indices.dtype)
+  # position k of the output reads indices[starts[j] + k - offsets[j]]
+  offsets = np.cumsum(lengths) - lengths
+  positions = np.arange(total) + np.repeat(starts - offsets, lengths)
+  return indices[positions]
@@ -0,0 +1,160 @@
+import numpy as np
+from batchscoring import entries
+from distances import DistanceRows
+from graphbuild import buildgraph
+from graphmatrices import edgearrays, decayweights, symmetricmatrix, neighbours
+from neighbourhoods import NeighbourhoodIndex
+from ranking import TopRank
+from weightedpaths import weightedpathcounts, checklength
+
+
+def within(indptr, indices, vertices, d):
+  '''Returns the sorted vertices at most d hops away from any given vertex.'''
+  reached = np.unique(np.asarray(vertices, dtype=indices.dtype))
+  frontier = reached
+  for _ in xrange(d):
+    frontier = np.setdiff1d(np.unique(neighbours(indptr, indices, frontier)),
+                            reached, assume_unique=True)
+    if not len(frontier):
+      break
+    reached = np.union1d(reached, frontier)
+  return reached
+
+
+class IncrementalScorer(object):
+  '''Keeps the pathscorer score of every candidate pair of a growing graph.
+
+  Pair (u, v), u < v and 2 <= dist(u, v) <= d, scores the modified Jaccard
+  of the dist(u, v)-balls of u and v times the age-weighted path counts of
+  length 2..d. Those counts are linear in the edge weights, which are
+  1/(lastyear-age+1) for every edge of a given age, so each row keeps one
+  path count component per edge year and the score for any lastyear is
+  the components' combination with that year's weights. Moving lastyear
+  is a recombination: no path is counted again.
+
+  New edges only change the paths, distances and balls of the vertices
+  within d hops of their endpoints. addedges rescores those rows, and
+  refreshes the Jaccard of the other rows' pairs with one of them. d can
+  be at most weightedpaths.EXACTLENGTH, past which the counts are bounds.
+
+  Attributes:
+    d, lastyear: as given to pathscorer.
+    years: the edge years, in the order of the row components.
+    rows: maps each row u to its (targets, jaccards, components) arrays,
+      components holding one row per year known when u was scored.
+  '''
+
+  def __init__(self, g, d, lastyear, blocksize=256):
+    checklength(d)
+    sources, targets, edgeindexes = edgearrays(g)
+    self.sources = sources.astype(np.int64)
+    self.targets = targets.astype(np.int64)
+    self.ages = g.edge_properties["age"].a[edgeindexes].astype(np.int64)
+    self.vertexindexes = g.vertex_properties["index"].a[:g.num_vertices()].copy()
+    self.d = d
+    self.lastyear = lastyear
+    self.blocksize = blocksize
+    self.years = []
+    self.rows = {}
+    self.index = None
+    self.rebuild()
+    self.scorerows(np.arange(self.n - 1))
+
+  def rebuild(self):
+    '''Builds the graph, matrices and searches out of the edge arrays.'''
+    self.g = buildgraph(self.sources, self.targets, self.ages,
+                        len(self.vertexindexes))
+    self.n = self.g.num_vertices()
+    ones = np.ones(len(self.sources))
+    self.multiplicities = symmetricmatrix(self.sources, self.targets, ones,
+                                          self.n)
+    self.years += sorted(set(np.unique(self.ages)) - set(self.years))
+    self.yearmatrices = [
+        symmetricmatrix(self.sources[self.ages == year],
+                        self.targets[self.ages == year],
+                        ones[self.ages == year], self.n)
+        for year in self.years]
+    self.distances = DistanceRows(self.g, self.d)
+    if self.index is None:
+      self.index = NeighbourhoodIndex(self.g)
+
+  def coefficients(self):
+    '''Returns the weight every edge year has for lastyear.'''
+    return decayweights(self.years, self.lastyear)
+
+  def scorerows(self, rows):
+    '''Counts the paths and Jaccards of the given rows' pairs again.'''
+    rows = np.asarray(rows, dtype=np.int64)
+    for start in xrange(0, len(rows), self.blocksize):
+      block = rows[start:start + self.blocksize]
+      components = []
+      for yearmatrix in self.yearmatrices:
+        paths = weightedpathcounts(self.multiplicities, yearmatrix, block,
+                                   self.d)
+        components.append(sum(paths[2:]).tocsr())
+      for i, u in enumerate(block):
+        targets, distances = self.distances.candidates(u)
+        jaccards = np.array([self.index.jaccard(u, v, r)
+                             for v, r in zip(targets, distances)])
+        positions = np.repeat(i, len(targets))
+        self.rows[int(u)] = (targets, jaccards, np.array(
+            [entries(c, positions, targets) for c in components]).reshape(
+                len(components), len(targets)))
+
+  def refreshjaccards(self, rows, changed):
+    '''Computes the Jaccards of the rows' pairs with a changed target again.'''
+    for u in rows:
+      targets, jaccards, components = self.rows[int(u)]
+      _, distances = self.distances.candidates(u)
+      for j in np.flatnonzero(changed[targets]):
+        jaccards[j] = self.index.jaccard(u, targets[j], distances[j])
+
+  def addedges(self, sources, targets, years, lastyear=None):
+    '''Adds the (source, target) edges of the given years to the graph.
+
+    Vertices past the last one are added along, their "index" following
+    the vertex numbering. Only the rows within d hops of an endpoint are
+    scored again; lastyear moves to the given year, if any.
+    '''
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    oldn = self.n
+    n = max(oldn, int(max(sources.max(), targets.max())) + 1)
+    self.vertexindexes = np.concatenate(
+        (self.vertexindexes, np.arange(oldn, n)))
+    self.sources = np.concatenate((self.sources, sources))
+    self.targets = np.concatenate((self.targets, targets))
+    self.ages = np.concatenate((self.ages, np.asarray(years, dtype=np.int64)))
+    if lastyear is not None:
+      self.lastyear = lastyear
+    self.rebuild()
+    indptr, indices = self.multiplicities.indptr, self.multiplicities.indices
+    touched = within(indptr, indices, np.concatenate((sources, targets)),
+                     self.d)
+    self.index.forget(touched, self.multiplicities)
+    changed = np.zeros(self.n, dtype=bool)
+    changed[touched] = True
+    # the former last row had no pairs yet
+    rescored = np.union1d(touched, np.arange(oldn - 1, n))
+    rescored = rescored[rescored < self.n - 1]
+    # further rows only see those vertices' balls change, as pair targets
+    nearby = within(indptr, indices, touched, self.d)
+    nearby = np.setdiff1d(nearby, rescored, assume_unique=True)
+    self.refreshjaccards(nearby[nearby < self.n - 1], changed)
+    self.scorerows(rescored)
+
+  def rowscores(self, u):
+    '''Returns the targets of row u and their scores for lastyear.'''
+    targets, jaccards, components = self.rows[int(u)]
+    weights = self.coefficients()[:len(components)]
+    return targets, jaccards * weights.dot(components)
+
+  def rank(self, k):
+    '''Returns the TopRank of the k best pairs, by their "index" values.'''
+    rank = TopRank(k)
+    for u in xrange(self.n - 1):
+      targets, scores = self.rowscores(u)
+      rank.extend(zip(scores.tolist(),
+                      [int(self.vertexindexes[u])] * len(targets),
+                      self.vertexindexes[targets].tolist()))
+    return rank
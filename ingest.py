@@ -0,0 +1,81 @@
+import xml.etree.cElementTree as ET
+import numpy as np
+from profiling import profiled
+
+
+class GrowableArray(object):
+  '''A preallocated NumPy array doubling its capacity when it fills up.
+
+  Appends are amortized O(1) and the values take a single contiguous
+  block, instead of a Python object per value.
+  '''
+
+  def __init__(self, dtype, capacity=1 << 16):
+    self.data = np.empty(capacity, dtype=dtype)
+    self.size = 0
+
+  def __len__(self):
+    return self.size
+
+  def extend(self, values):
+    values = np.asarray(values, dtype=self.data.dtype)
+    end = self.size + len(values)
+    if end > len(self.data):
+      data = np.empty(max(end, 2 * len(self.data)), dtype=self.data.dtype)
+      data[:self.size] = self.data[:self.size]
+      self.data = data
+    self.data[self.size:end] = values
+    self.size = end
+
+  def array(self):
+    '''Returns the filled part of the array, without copying it.'''
+    return self.data[:self.size]
+
+@profiled("ingest")
+def coauthorships(source, tag="article"):
+  '''Streams the co-authorship edges out of a DBLP XML file.
+
+  The file is parsed a single time. Authors get their ids the first time
+  they are seen, and the edges of each article are emitted, along with its
+  year, as soon as the element closes; each author is linked to the next
+  one in the article's author list, as read.py always did. Articles with
+  no year or a single author are left out. Every element is freed once
+  parsed, so memory is bound by the edge arrays and the author ids.
+
+  Returns the (sources, targets, years) edge arrays and the list of author
+  names, indexed by their ids.
+  '''
+  sources = GrowableArray(np.int32)
+  targets = GrowableArray(np.int32)
+  years = GrowableArray(np.int32)
+  authorindexes = {}
+  authors = []
+  depth = 0
+  root = None
+  for event, elem in ET.iterparse(source, events=("start", "end")):
+    if event == "start":
+      if root is None:
+        root = elem
+      depth += 1
+      continue
+    depth -= 1
+    if depth != 1:
+      continue
+    if elem.tag == tag:
+      year = elem.findtext("year")
+      names = [a.text.encode('utf-8').strip() for a in elem.iter("author")
+               if a.text]
+      if year and len(names) > 1:
+        ids = []
+        for name in names:
+          if name not in authorindexes:
+            authorindexes[name] = len(authors)
+            authors.append(name)
+          ids.append(authorindexes[name])
+        sources.extend(ids[:-1])
+        targets.extend(ids[1:])
+        years.extend([int(year)] * (len(ids) - 1))
+    # a record is done with: drop it and whatever the root still holds
+    elem.clear()
+    root.clear()
+  return sources.array(), targets.array(), years.array(), authors
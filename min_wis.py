@@ -1,5 +1,15 @@
+from bisect import bisect_right
 from collections import defaultdict
+import functools
 from itertools import izip
+import math
+import numpy as np
+from arrayfile import savearrays, loadarrays
+from encoding import BitStringEncoder, address_keys, key_view
+from profiling import profiled
+
+# the Mersenne prime 2**61 - 1, modulus of HashedNeuron's hash functions
+MERSENNE61 = (1 << 61) - 1
 
 
 class Neuron(object):
@@ -28,6 +38,15 @@ class Neuron(object):
         '''Returns true iff the location being addressed is written.'''
         raise NotImplementedError('This method is abstract. Override it.')
 
+    def record_many(self, addresses):
+        '''Writes every location addressed by the given sequence.'''
+        for address in addresses:
+            self.record(address)
+
+    def answer_many(self, addresses):
+        '''Returns the answers to every address of the given sequence.'''
+        return [self.answer(address) for address in addresses]
+
     def count(self, address):
         '''Returns how many times the location being addressed was written.'''
         raise NotImplementedError('This method is abstract. Override it.')
@@ -123,6 +142,244 @@ class DictNeuron(Neuron):
                 del self.locations[address]
 
 
+class ArrayNeuron(Neuron):
+    '''A neuron keeping its written locations in sorted NumPy arrays.
+
+    Addresses may be ints or the fixed size keys of encoding.address_keys,
+    but a neuron must only be given one kind. Recorded addresses are
+    buffered and merged into the sorted arrays when next read, so answering
+    a whole column of addresses is a single searchsorted call.
+    '''
+
+    def __init__(self):
+        self.addresses = None
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.pending = []
+
+    @classmethod
+    def from_arrays(cls, addresses, counts):
+        '''Returns a neuron holding the given sorted addresses and counts.
+
+        The arrays are used as they are, so memory-mapped ones are only read
+        where they are searched. Recording or bleaching makes new arrays.
+        '''
+
+        neuron = cls()
+        neuron.addresses, neuron.counts = addresses, counts
+        return neuron
+
+    def __len__(self):
+        return len(self._merged())
+
+    def __iter__(self):
+        return iter(self._merged())
+
+    def _merged(self):
+        if self.pending:
+            addresses = list(self.pending)
+            counts = [np.ones(len(a), dtype=np.int64) for a in addresses]
+
+            if self.addresses is not None:
+                addresses.insert(0, self.addresses)
+                counts.insert(0, self.counts)
+
+            if len(set(a.dtype for a in addresses if len(a))) > 1:
+                # e.g. int addresses recorded into loaded wide keys
+                counts = [c for a, c in izip(addresses, counts) if len(a)]
+                addresses = [a for a in addresses if len(a)]
+                words = max(address_words(a).shape[1] for a in addresses)
+                addresses = [fit_keys(a, words)[0] for a in addresses]
+
+            self.addresses, inverse = np.unique(np.concatenate(addresses),
+                                                return_inverse=True)
+            self.counts = np.bincount(
+                inverse, weights=np.concatenate(counts)).astype(np.int64)
+            self.pending = []
+        elif self.addresses is None:
+            return np.zeros(0, dtype=np.uint64)
+
+        return self.addresses
+
+    def record(self, address):
+        self.pending.append(as_keys([address]))
+
+    def record_many(self, addresses):
+        '''Writes every location addressed by the given array.'''
+        self.pending.append(as_keys(addresses).ravel())
+
+    def _find(self, addresses):
+        stored = self._merged()
+        addresses = as_keys(addresses)
+        fits = True
+        if stored.dtype.kind == 'V' and addresses.dtype != stored.dtype:
+            addresses, fits = fit_keys(addresses, stored.dtype.itemsize / 8)
+        found = np.searchsorted(stored, addresses)
+        found[found == len(stored)] = 0
+        hits = (stored[found] == addresses) & fits if len(stored) else \
+            np.zeros(len(addresses), dtype=bool)
+        return found, hits
+
+    def answer(self, address):
+        return bool(self.answer_many([address])[0])
+
+    def answer_many(self, addresses):
+        '''Returns whether each location addressed by the array is written.'''
+        return self._find(addresses)[1]
+
+    def count(self, address):
+        return int(self.count_many([address])[0])
+
+    def count_many(self, addresses):
+        '''Returns how many times each location addressed was written.'''
+        found, hits = self._find(addresses)
+        return np.where(hits, self.counts[found] if len(self.counts) else 0, 0)
+
+    def bit_counts(self):
+        bit_freq = [0]
+
+        for addr, freq in izip(self._merged(), self.counts):
+            addr, freq = int(addr), int(freq)
+            while addr:
+                last_bit_index = (addr & -addr).bit_length() - 1
+                bit_freq.extend([0] * (last_bit_index + 1 - len(bit_freq)))
+                bit_freq[last_bit_index] += freq
+                addr &= addr - 1  # unset last bit
+
+        return bit_freq
+
+    def intersection_level(self, neuron):
+        a, b = self._merged(), neuron._merged()
+        len_intrsctn = len(np.intersect1d(a, b, assume_unique=True))
+        return len_intrsctn * 1. / (len(a) + len(b) - len_intrsctn)
+
+    def bleach(self, threshold):
+        self._merged()
+        kept = self.counts > threshold
+        self.addresses = self.addresses[kept]
+        self.counts = self.counts[kept] - threshold
+
+    def min_answer(self):
+        return 0
+
+    def max_answer(self):
+        return 1
+
+
+class HashedNeuron(Neuron):
+    '''A neuron counting its writes in a fixed size count-min sketch.
+
+    The sketch is a depth x width array of counters. Each of its rows has
+    its own universal hash function, (a * x + b) mod 2**61 - 1 for random a
+    and b, x running over the address 32 bits at a time, scaled down to a
+    counter position. The address words are scrambled first (see mix64),
+    as runs of consecutive addresses would otherwise pile up in a few
+    counters for some a. Writing an
+    address increments its counter in every row and its count is the
+    lowest of them, so counts are never underestimated and the memory
+    taken is depth * width counters however many addresses are written.
+
+    An address never written is answered as written when all its counters
+    were hit by other addresses. After n distinct addresses, this false
+    positive rate is about (1 - e**(-n / width)) ** depth, which
+    false_positive_rate() estimates from the counters in use; a width a
+    few times the distinct addresses expected keeps it low.
+
+    The written addresses are not kept, so the neuron can't be iterated
+    and its length is an estimate. Use functools.partial(HashedNeuron,
+    width=..., depth=...) as a Discriminator neuron_factory to size it.
+    '''
+
+    def __init__(self, width=1 << 12, depth=4, seed=0, dtype=np.uint32):
+        random = np.random.RandomState(seed)
+        self.width = width
+        self.depth = depth
+        self.a = random.randint(1, MERSENNE61, size=(depth, 1)).astype(np.uint64)
+        self.b = random.randint(0, MERSENNE61, size=(depth, 1)).astype(np.uint64)
+        self.counters = np.zeros((depth, width), dtype=dtype)
+
+    @classmethod
+    def sized(cls, memory, depth=4, seed=0, dtype=np.uint32):
+        '''Returns a neuron whose counters take about memory bytes.'''
+        width = max(1, memory // (depth * np.dtype(dtype).itemsize))
+        return cls(width, depth, seed, dtype)
+
+    def __len__(self):
+        '''Returns the estimated number of distinct addresses written.
+
+        Each row is a linear counter: with z of its width counters still
+        zero, about -width * ln(z / width) addresses were hashed into it.
+        '''
+        zeros = max((self.counters == 0).sum(axis=1).max(), 1)
+        return int(round(-self.width * math.log(zeros * 1. / self.width)))
+
+    def __iter__(self):
+        raise TypeError('A HashedNeuron does not keep its addresses.')
+
+    def _cells(self, addresses):
+        '''Returns the depth x m counter positions of the addresses.'''
+        words = mix64(address_words(addresses))
+        acc = np.zeros((self.depth, len(words)), dtype=np.uint64)
+        # most significant word first, so leading zero words change nothing
+        for word in words.T[::-1]:
+            for chunk in (word >> np.uint64(32), word & np.uint64(0xffffffff)):
+                acc = mod61(mulmod61(acc, self.a) + chunk)
+        hashes = mod61(mulmod61(acc, self.a) + self.b).astype(np.float64)
+        cells = (hashes * (float(self.width) / MERSENNE61)).astype(np.int64)
+        return np.minimum(cells, self.width - 1)
+
+    def record(self, address):
+        self.record_many([address])
+
+    def record_many(self, addresses):
+        '''Writes every location addressed by the given sequence.'''
+        cells = self._cells(addresses)
+        for row in xrange(self.depth):
+            np.add.at(self.counters[row], cells[row], 1)
+
+    def answer(self, address):
+        return bool(self.answer_many([address])[0])
+
+    def answer_many(self, addresses):
+        '''Returns whether each location addressed seems to be written.'''
+        return self.count_many(addresses) > 0
+
+    def count(self, address):
+        return int(self.count_many([address])[0])
+
+    def count_many(self, addresses):
+        '''Returns the lowest counter of each address, never below its count.'''
+        cells = self._cells(addresses)
+        return self.counters[np.arange(self.depth)[:, np.newaxis],
+                             cells].min(axis=0).astype(np.int64)
+
+    def false_positive_rate(self):
+        '''Returns the probability an unwritten address answers as written.'''
+        return float(np.prod((self.counters > 0).mean(axis=1)))
+
+    def bit_counts(self):
+        raise TypeError('A HashedNeuron does not keep its addresses.')
+
+    def intersection_level(self, neuron):
+        '''Estimates (a & b)/(a | b) from the sketches' nonzero counters.
+
+        Both neurons must have been built with the same width, depth and
+        seed, so an address hits the same counters in both.
+        '''
+        a, b = self.counters > 0, neuron.counters > 0
+        return (a & b).sum() * 1. / max((a | b).sum(), 1)
+
+    def bleach(self, threshold):
+        self.counters = np.where(self.counters > threshold,
+                                 self.counters - threshold,
+                                 0).astype(self.counters.dtype)
+
+    def min_answer(self):
+        return 0
+
+    def max_answer(self):
+        return 1
+
+
 class Discriminator(object):
     '''The default WiSARD discriminator.'''
 
@@ -156,6 +413,18 @@ class Discriminator(object):
         for address, neuron in izip(observation, self.neurons):
             neuron.record(address)
 
+    def record_many(self, observations):
+        '''Record each row of the provided 2-D array of addresses.
+
+        Each neuron is handed its whole column of addresses at once.
+        '''
+
+        if self.neurons is None:
+            self.neurons = [self.neuron_factory() for _ in observations[0]]
+
+        for addresses, neuron in izip(columns(observations), self.neurons):
+            neuron.record_many(addresses)
+
     def answer(self, observation):
         '''Returns how similar the observation is to the stored knowledge.
 
@@ -167,6 +436,16 @@ class Discriminator(object):
         return sum(neuron.answer(address)
             for address, neuron in izip(observation, self.neurons))
 
+    def answer_many(self, observations):
+        '''Returns the answers to each row of a 2-D array of addresses.
+
+        The answers are returned as an array, in the order of the rows.
+        '''
+
+        answers = [neuron.answer_many(addresses)
+            for addresses, neuron in izip(columns(observations), self.neurons)]
+        return np.sum(answers, axis=0, dtype=np.int64)
+
     def counts(self, observation):
         '''Returns how many times the observation addresses were recorded.
 
@@ -179,6 +458,17 @@ class Discriminator(object):
         counts = (n.count(addr) for addr, n in izip(observation, self.neurons))
         return sorted(c for c in counts if c)
 
+    def bleached_answer(self, observation, threshold):
+        '''Returns what answer(observation) would be after bleach(threshold).
+
+        Nothing is bleached: a neuron keeps an address through the bleaching
+        only when its count is over the threshold, so the answer is read off
+        the sorted counts of the observation by bisection.
+        '''
+
+        counts = self.counts(observation)
+        return len(counts) - bisect_right(counts, threshold)
+
     def drasiw(self):
         '''Returns how many times each bit was set in the addresses recorded.
 
@@ -219,6 +509,124 @@ class Discriminator(object):
         '''
         return sum(neuron.max_answer() for neuron in self.neurons)
 
+    def save(self, path, encoder=None):
+        '''Saves the recorded locations, along with the encoder mapping.
+
+        See save_model.
+        '''
+
+        save_model(path, self, encoder)
+
+    @classmethod
+    def load(cls, path):
+        '''Returns the (discriminator, encoder) saved at path.'''
+
+        return load_model(path)
+
+
+class ArrayDiscriminator(Discriminator):
+    '''A discriminator answering many observations in a single call.
+
+    Its neurons default to ArrayNeuron. Once recorded, the written
+    locations of all its neurons are gathered into one sorted table of
+    (neuron, address) keys, so a whole m x neurons matrix of observations
+    is answered with a single search.
+    '''
+
+    def __init__(self, neuron_factory=ArrayNeuron):
+        super(ArrayDiscriminator, self).__init__(neuron_factory)
+        self.table = None
+        self.table_counts = None
+
+    def record(self, observation):
+        self.record_many([observation])
+
+    def record_many(self, observations):
+        super(ArrayDiscriminator, self).record_many(as_keys(observations))
+        self.table = None
+
+    def bleach(self, threshold):
+        super(ArrayDiscriminator, self).bleach(threshold)
+        self.table = None
+
+    def _table(self):
+        if self.table is None:
+            keys = np.concatenate([neuron_keys(i, neuron._merged())
+                                   for i, neuron in enumerate(self.neurons)])
+            order = np.argsort(keys)
+            self.table = keys[order]
+            self.table_counts = np.concatenate(
+                [neuron.counts for neuron in self.neurons])[order]
+        return self.table
+
+    def _searchable(self, observations):
+        if observations.dtype.kind not in 'uV' or not all(
+                isinstance(neuron, ArrayNeuron) for neuron in self.neurons):
+            return False
+
+        # keys of another width are left to the neurons to fit
+        table = self._table()
+        return table.dtype.itemsize == observations.dtype.itemsize + 8
+
+    def count_many(self, observations):
+        '''Returns how many times each observation address was recorded.
+
+        The counts are returned as an m x neurons array, looked up in the
+        table with a single search.
+        '''
+
+        observations = as_keys(observations)
+        table = self._table()
+        neurons = np.arange(observations.shape[1])
+        keys = neuron_keys(neurons[np.newaxis, :], observations)
+        if not len(table):
+            return np.zeros(keys.shape, dtype=np.int64)
+        found = np.searchsorted(table, keys)
+        found[found == len(table)] = 0
+        return np.where(table[found] == keys, self.table_counts[found], 0)
+
+    def counts(self, observation):
+        observation = as_keys([observation])
+        if not self._searchable(observation):
+            return super(ArrayDiscriminator, self).counts(observation[0])
+
+        counts = self.count_many(observation)[0]
+        return sorted(counts[counts > 0].tolist())
+
+    def answer(self, observation):
+        return self.answer_many([observation])[0].item()
+
+    def answer_many(self, observations):
+        '''Returns how similar each observation is to the stored knowledge.
+
+        The observations are given as an m x neurons matrix of addresses,
+        one observation per row, and their m answers are returned.
+        '''
+
+        observations = as_keys(observations)
+        if not self._searchable(observations):
+            return super(ArrayDiscriminator, self).answer_many(observations)
+
+        table = self._table()
+        neurons = np.arange(observations.shape[1])
+        keys = neuron_keys(neurons[np.newaxis, :], observations)
+        found = np.searchsorted(table, keys)
+        found[found == len(table)] = 0
+        return (table[found] == keys).sum(axis=1) if len(table) else \
+            np.zeros(len(observations), dtype=np.int64)
+
+    @staticmethod
+    @profiled("wisard.answer")
+    def compare(recorded, observations):
+        '''Answers as a discriminator which only recorded one observation.
+
+        This is the record-and-compare fast path: such a discriminator
+        answers how many of each observation addresses are equal to the
+        recorded ones, which needs no neuron at all.
+        '''
+
+        return (as_keys(observations) == as_keys(recorded)).sum(axis=-1)
+
 
 class WiSARDLikeClassifier(object):
     '''The superclass of all WiSARD-like classifiers.
@@ -280,9 +688,16 @@ class WiSARD(WiSARDLikeClassifier):
 
         self.discriminators = defaultdict(discriminator)
 
+    @profiled("wisard.train")
     def record(self, observation, class_):
         self.discriminators[class_].record(observation)
 
+    @profiled("wisard.train")
+    def record_many(self, observations, class_):
+        '''Records each row of a 2-D array of addresses as of the class.'''
+        self.discriminators[class_].record_many(observations)
+
+    @profiled("wisard.answer")
     def answers(self, observation, class_=None):
         if class_ is not None:
             return self.discriminators[class_].answer(observation)
@@ -290,6 +705,21 @@ class WiSARD(WiSARDLikeClassifier):
         return {class_: dscrmntr.answer(observation)
             for class_, dscrmntr in self.discriminators.viewitems()}
 
+    @profiled("wisard.answer")
+    def answers_many(self, observations, classes=None):
+        '''Returns how similar each observation is to the known classes.
+
+        The observations are the rows of a 2-D array of addresses. The
+        answers are returned as a classes x observations array, whose rows
+        follow the given classes, or the sorted class labels by default.
+        '''
+
+        if classes is None:
+            classes = sorted(self.discriminators)
+
+        return np.array([self.discriminators[class_].answer_many(observations)
+                         for class_ in classes])
+
     def counts(self, observation, class_=None):
         if class_ is not None:
             return self.discriminators[class_].counts(observation)
@@ -297,9 +727,287 @@ class WiSARD(WiSARDLikeClassifier):
         return {class_: dscrmntr.counts(observation)
             for class_, dscrmntr in self.discriminators.viewitems()}
 
+    def bleached_answers(self, observation, threshold, class_=None):
+        '''Returns the answers bleach(threshold) would lead to, not bleaching.'''
+        if class_ is not None:
+            return self.discriminators[class_].bleached_answer(observation,
+                                                               threshold)
+
+        return {class_: dscrmntr.bleached_answer(observation, threshold)
+            for class_, dscrmntr in self.discriminators.viewitems()}
+
+    def best_threshold(self, observation):
+        '''Returns the smallest bleaching threshold with a single best class.
+
+        The answers only change when the threshold goes past one of the
+        observation counts, so these are the only thresholds tried, each
+        class answering by bisection of its sorted counts (see counts).
+        Whether the best answer is tied is not monotone in the threshold,
+        as bleaching can break a tie and make another one later on, so the
+        thresholds are walked in order instead of bisected. When the best
+        answer is tied at every threshold, 0 is returned.
+
+        Returns the threshold and the dictionary of the answers at it.
+        '''
+
+        classes = list(self.discriminators)
+        histograms = [np.asarray(self.discriminators[class_].counts(
+            observation), dtype=np.int64) for class_ in classes]
+        thresholds = np.unique(np.concatenate([[0]] + histograms))
+        answers = np.array([len(histogram) -
+                            np.searchsorted(histogram, thresholds, 'right')
+                            for histogram in histograms])
+        if len(classes) > 1:
+            best = np.sort(answers, axis=0)
+            untied = np.flatnonzero(best[-1] > best[-2])
+        else:
+            untied = [0]
+        at = untied[0] if len(untied) else 0
+        return (int(thresholds[at]),
+                dict(izip(classes, answers[:, at].tolist())))
+
     def bleach(self, threshold):
         for d in self.discriminators:
             self.discriminators[d].bleach(threshold)
 
     def remove_class(self, class_):
         del self.discriminators[class_]
+
+    def save(self, path, encoder=None):
+        '''Saves every discriminator, along with the encoder mapping.
+
+        The class labels must be strings or ints. See save_model.
+        '''
+
+        save_model(path, self, encoder)
+
+    @classmethod
+    def load(cls, path):
+        '''Returns the (wisard, encoder) saved at path.'''
+
+        return load_model(path)
+
+
+def as_keys(addresses):
+    '''Returns the given addresses as an array of orderable keys.
+
+    Int addresses become uint64, or Python ints when too wide for it, while
+    the fixed size keys of encoding.address_keys are kept as they are.
+    '''
+
+    keys = np.asarray(addresses)
+    if keys.dtype.kind in 'iub':
+        return keys.astype(np.uint64)
+    if keys.dtype.kind == 'O' and keys.size and \
+            all(0 <= int(k) < 1 << 64 for k in keys.flat):
+        return keys.astype(np.uint64)
+    return keys
+
+
+def neuron_keys(neurons, keys):
+    '''Prefixes each key with the index of its neuron, as a single key.
+
+    The keys must be uint64 or encoding.address_keys voids; neurons must
+    be broadcastable against them.
+    '''
+
+    neurons, keys = np.broadcast_arrays(np.asarray(neurons, dtype=np.uint64),
+                                        keys)
+    words = keys.dtype.itemsize / 8
+    packed = np.empty(keys.shape + (words + 1,), dtype=np.uint64)
+    packed[..., 0] = neurons
+    packed[..., 1:] = np.ascontiguousarray(keys).view(np.uint64).reshape(
+        keys.shape + (words,))
+    return packed.view(np.dtype((np.void, 8 * (words + 1))))[..., 0]
+
+
+def fit_keys(addresses, words):
+    '''Returns the addresses as keys of the given number of words.
+
+    Also returns which addresses fit in that many words; the keys of the
+    others are truncated and must not be taken as matches.
+    '''
+
+    addresses = np.asarray(addresses)
+    packed = address_words(addresses)
+    fits = ~packed[:, words:].any(axis=1)
+    packed = np.hstack((packed[:, :words], np.zeros(
+        (len(packed), max(words - packed.shape[1], 0)), dtype=np.uint64)))
+    return (key_view(packed).reshape(addresses.shape),
+            fits.reshape(addresses.shape))
+
+
+def pack_neurons(neurons):
+    '''Lays the recorded locations of the neurons end to end.
+
+    Returns the (indptr, addresses, counts) arrays: neuron i owns the sorted
+    addresses[indptr[i]:indptr[i + 1]] and their counts. The addresses of
+    all neurons are given the width of the widest one.
+    '''
+
+    keys, counts = [], []
+    for neuron in neurons:
+        if isinstance(neuron, ArrayNeuron):
+            keys.append(neuron._merged())
+            counts.append(np.asarray(neuron.counts, dtype=np.int64))
+        else:
+            addresses = list(neuron)
+            keys.append(as_keys(addresses) if addresses else
+                        np.zeros(0, dtype=np.uint64))
+            counts.append(np.array([neuron.count(address)
+                                    for address in addresses], dtype=np.int64))
+
+    if any(k.dtype != np.uint64 for k in keys):
+        words = max(address_words(k).shape[1] for k in keys if len(k))
+        keys = [fit_keys(k, words)[0] for k in keys]
+
+    for i, k in enumerate(keys):
+        order = np.argsort(k)
+        keys[i], counts[i] = k[order], counts[i][order]
+
+    indptr = np.concatenate(([0], np.cumsum([len(k) for k in keys])))
+    if not keys:
+        return indptr, np.zeros(0, dtype=np.uint64), np.zeros(0, np.int64)
+
+    return indptr, np.concatenate(keys), np.concatenate(counts)
+
+
+def unpack_neurons(indptr, addresses, counts):
+    '''Returns the ArrayNeurons of arrays laid out by pack_neurons.'''
+
+    return [ArrayNeuron.from_arrays(addresses[start:end], counts[start:end])
+            for start, end in izip(indptr[:-1], indptr[1:])]
+
+
+def save_model(path, model, encoder=None):
+    '''Saves a WiSARD or a Discriminator, with its encoder mapping, if any.
+
+    Every discriminator is stored column-wise, as pack_neurons lays it out,
+    in a single arrayfile, so load_model can memory-map it back. Neurons
+    which don't keep their addresses, such as HashedNeuron, can't be saved,
+    nor can class labels other than strings and ints, which would not come
+    back the same out of the JSON header.
+    '''
+
+    if isinstance(model, WiSARD):
+        for class_ in model.discriminators:
+            if not isinstance(class_, (basestring, int, long)):
+                raise TypeError('Class labels must be strings or ints, not %r'
+                                % (class_,))
+        classes = sorted(model.discriminators)
+        discriminators = [model.discriminators[c] for c in classes]
+        meta = {'model': 'WiSARD', 'classes': classes}
+    else:
+        discriminators = [model]
+        meta = {'model': 'Discriminator'}
+
+    arrays = {}
+    for i, discriminator in enumerate(discriminators):
+        packed = pack_neurons(discriminator.neurons or [])
+        for name, array in izip(('indptr', 'addresses', 'counts'), packed):
+            arrays['%d.%s' % (i, name)] = array
+
+    meta['array_discriminators'] = all(
+        isinstance(d, ArrayDiscriminator) for d in discriminators)
+    if encoder is not None:
+        meta['nmbr_neurons'] = encoder.nmbr_neurons
+        if encoder.mapping:
+            arrays['mapping'] = np.asarray(encoder.mapping, dtype=np.int64)
+
+    savearrays(path, arrays, meta)
+
+
+def load_model(path):
+    '''Memory-maps the model saved by save_model.
+
+    Returns the WiSARD or Discriminator, whose neurons are ArrayNeurons,
+    and the BitStringEncoder saved with it, or None. Nothing but the header
+    is read until the model is answered.
+    '''
+
+    arrays, meta = loadarrays(path)
+    if meta['array_discriminators']:
+        discriminator = ArrayDiscriminator
+    else:
+        discriminator = functools.partial(Discriminator,
+                                          neuron_factory=ArrayNeuron)
+
+    def load_discriminator(i):
+        loaded = discriminator()
+        neurons = unpack_neurons(*[arrays['%d.%s' % (i, name)]
+                                   for name in ('indptr', 'addresses', 'counts')])
+        loaded.neurons = neurons or None
+        return loaded
+
+    if meta['model'] == 'WiSARD':
+        model = WiSARD(discriminator)
+        for i, class_ in enumerate(meta['classes']):
+            model.discriminators[class_] = load_discriminator(i)
+    else:
+        model = load_discriminator(0)
+
+    encoder = None
+    if 'nmbr_neurons' in meta:
+        encoder = BitStringEncoder(meta['nmbr_neurons'])
+        if 'mapping' in arrays:
+            encoder.mapping = arrays['mapping'].tolist()
+
+    return model, encoder
+
+
+def address_words(addresses):
+    '''Returns the addresses as m x words uint64, least significant first.'''
+
+    keys = as_keys(addresses).ravel()
+    if keys.dtype.kind == 'O':
+        bits = max(int(k).bit_length() for k in keys) if len(keys) else 0
+        keys = address_keys(keys, bits // 64 + 1)
+    if keys.dtype.kind == 'u':
+        return keys.astype(np.uint64).reshape(-1, 1)
+
+    return np.ascontiguousarray(keys).view(np.uint64).reshape(len(keys), -1)
+
+
+def mix64(words):
+    '''Scrambles uint64 words with the MurmurHash3 finalizer, a bijection.'''
+
+    shift = np.uint64(33)
+    words = words ^ (words >> shift)
+    words = words * np.uint64(0xff51afd7ed558ccd)
+    words = words ^ (words >> shift)
+    words = words * np.uint64(0xc4ceb9fe1a85ec53)
+    return words ^ (words >> shift)
+
+
+def mod61(x):
+    '''Reduces uint64 values below 2**63 modulo MERSENNE61.'''
+
+    x = (x & np.uint64(MERSENNE61)) + (x >> np.uint64(61))
+    return np.where(x >= np.uint64(MERSENNE61), x - np.uint64(MERSENNE61), x)
+
+
+def mulmod61(x, y):
+    '''Returns x * y modulo MERSENNE61 for uint64 values below it.
+
+    The product is split into 32 bits halves so that no partial product
+    overflows 64 bits, using 2**61 = 1 (mod MERSENNE61).
+    '''
+
+    low, shift = np.uint64(0xffffffff), np.uint64(32)
+    xh, xl = x >> shift, x & low
+    yh, yl = y >> shift, y & low
+    middle = xh * yl + xl * yh
+    middle = (middle >> np.uint64(29)) + \
+        ((middle & np.uint64((1 << 29) - 1)) << shift)
+    product = xl * yl
+    product = (product & np.uint64(MERSENNE61)) + (product >> np.uint64(61))
+    return mod61(mod61((xh * yh) << np.uint64(3)) + mod61(middle) + product)
+
+
+def columns(observations):
+    '''Returns an iterator over the columns of a 2-D array of addresses.'''
+
+    if isinstance(observations, np.ndarray):
+        return iter(observations.T)
+
+    return izip(*observations)
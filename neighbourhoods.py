@@ -0,0 +1,84 @@
+import collections
+import numpy as np
+from graphmatrices import multiplicitymatrix, neighbours
+from profiling import profiled
+
+
+class NeighbourhoodIndex(object):
+  '''Caches the k-hop balls of a graph's vertices as sorted index arrays.
+
+  Each (vertex, radius) ball is found by a single BFS the first time it is
+  asked for and kept as a sorted int32 array, so intersection and union
+  sizes of two balls are merges of two short arrays. Balls are evicted in
+  least recently used order once their total size goes over budget bytes.
+
+  Attributes:
+    indptr, indices: the CSR adjacency of the graph.
+    budget: how many bytes of balls may be kept at once.
+    size: how many bytes of balls are kept right now.
+  '''
+
+  def __init__(self, g, budget=256*1024*1024):
+    adjacency = multiplicitymatrix(g)
+    self.indptr = adjacency.indptr
+    self.indices = adjacency.indices.astype(np.int32)
+    self.budget = budget
+    self.size = 0
+    self.balls = collections.OrderedDict()
+
+  def ball(self, v, r):
+    '''Returns the sorted array of the vertices at most r hops from v.'''
+    key = (int(v), r)
+    ball = self.balls.pop(key, None)
+    if ball is None:
+      ball = self.search(int(v), r)
+      self.size += ball.nbytes
+      while self.size > self.budget and self.balls:
+        self.size -= self.balls.popitem(last=False)[1].nbytes
+    self.balls[key] = ball
+    return ball
+
+  def forget(self, vertices, adjacency=None):
+    '''Drops every cached ball of the given vertices.
+
+    When the graph changed, adjacency is its new multiplicity matrix and
+    vertices must hold every vertex within reach of a changed edge; the
+    balls of the other vertices are still right and are kept.
+    '''
+    if adjacency is not None:
+      self.indptr = adjacency.indptr
+      self.indices = adjacency.indices.astype(np.int32)
+    forgotten = set(int(v) for v in vertices)
+    for key in [key for key in self.balls if key[0] in forgotten]:
+      self.size -= self.balls.pop(key).nbytes
+
+  def search(self, v, r):
+    ball = np.array([v], dtype=np.int32)
+    frontier = ball
+    for _ in xrange(r):
+      reached = np.unique(neighbours(self.indptr, self.indices, frontier))
+      frontier = np.setdiff1d(reached, ball, assume_unique=True)
+      if not len(frontier):
+        break
+      ball = np.union1d(ball, frontier)
+    return ball
+
+  def intersection(self, u, v, r):
+    '''Returns how many vertices are at most r hops from both u and v.'''
+    a, b = self.ball(u, r), self.ball(v, r)
+    if len(a) > len(b):
+      a, b = b, a
+    found = np.searchsorted(b, a)
+    found[found == len(b)] = 0
+    return int(np.count_nonzero(b[found] == a))
+
+  def union(self, u, v, r):
+    '''Returns how many vertices are at most r hops from u or v.'''
+    return len(self.ball(u, r)) + len(self.ball(v, r)) - self.intersection(u, v, r)
+
+  @profiled("jaccard")
+  def jaccard(self, u, v, r):
+    '''Returns the intersection over union of the r-balls of u and v.'''
+    intersection = self.intersection(u, v, r)
+    union = len(self.ball(u, r)) + len(self.ball(v, r)) - intersection
+    return float(intersection)/float(union)
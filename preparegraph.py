@@ -1,6 +1,10 @@
 from graph_tool.all import *
-import random
-g2 = load_graph("connected.xml.gz")
+from snapshot import loadgraph, savegraph
+from cores import kcore
+from sampling import uniformsample, distancesample
+from temporal import yearmask, temporalsplit
+import profiling
+g2 = loadgraph("connected.snap")
 g = g2.copy()
 
 print g.num_vertices()
@@ -8,14 +12,7 @@ print g.num_edges()
 print g.is_directed()
 
 def filteredges(g, fromyear, toyear):
-  edgefilter = g.new_edge_property("bool")
-  edgeages = g.edge_properties["age"]
-  for e in g.edges():
-    if edgeages[e] >= fromyear and edgeages[e] <= toyear:
-      edgefilter[e] = True
-    else:
-      edgefilter[e] = False
-  return edgefilter
+  return yearmask(g, fromyear, toyear)
 
 def filteredgescolor(g, fromyear, toyear):
   edgefilter = g.new_edge_property("string")
@@ -38,21 +35,11 @@ def filtervertices(g, degree):
   return vertexfilter
 
 def minimumdegree(g, degree):
-  i = True
-  while i is True:
-    print "Let's do it"
-    edges = g.num_edges()
-    g.set_vertex_filter(filtervertices(g, degree))
-    g.purge_vertices()
-    if edges == g.num_edges():
-      break
-    print g.num_vertices()
-    print g.num_edges()
-    i = False
-    for v in g.vertices():
-      if v.out_degree() >= degree:
-	i = True
-	break
+  g.set_vertex_filter(kcore(g, degree))
+  g.purge_vertices()
+  print g.num_vertices()
+  print g.num_edges()
+
 def assignindexes(g):
   vertexindexes = g.new_vertex_property("int")
   i = 0
@@ -62,33 +49,11 @@ def assignindexes(g):
   g.vertex_properties["index"] = vertexindexes
 
 def shrinknetwork(g, p):
-  toremove = g.new_vertex_property("bool")
-  for v in g.vertices():
-    if p > random.uniform(0, 1):
-      toremove[v] = True
-    else:
-      toremove[v] = False
-  return toremove
+  return uniformsample(g, p)
 
 def shrinknetworkbydistance(g, alpha):
-  toremove = g.new_vertex_property("bool")
-  highestdegreevertex = g.vertex(0)
-  for v in g.vertices():
-    if v.out_degree() > highestdegreevertex.out_degree():
-      highestdegreevertex = v
-  for v in g.vertices():
-    shortestdistance = shortest_distance(g, highestdegreevertex, v)
-    if shortestdistance == 0:
-      p = 1.0
-    elif shortestdistance > 6:
-      p = 0.0
-    else:
-      p = (0.3) / shortest_distance(g, highestdegreevertex, v)**3
-    if p > random.uniform(0, 1):
-      toremove[v] = True
-    else:
-      toremove[v] = False
-  return toremove
+  # vertices over 6 hops away from the hub are never kept
+  return distancesample(g, alpha)
 
 
 yearfilter = filteredges(g, 2010, 2013)
@@ -119,16 +84,8 @@ print "2010-2013 vertices:" + str(smallg.num_vertices())
 print "2010-2013 edges:" + str(smallg.num_edges())
 assignindexes(smallg)
 
-g2010_2012 = smallg.copy()
-g2013 = smallg.copy()
-
-yearfilter = filteredges(g2010_2012, 2010, 2012)
-g2010_2012.set_edge_filter(yearfilter)
-g2010_2012.purge_edges()
-
-yearfilter = filteredges(g2013, 2013, 2013)
-g2013.set_edge_filter(yearfilter)
-g2013.purge_edges()
+#training and test views of smallg, sharing its storage
+g2010_2012, g2013 = temporalsplit(smallg, [(2010, 2012), (2013, 2013)])
 
 print "2010-2012"
 print g2010_2012.num_vertices()
@@ -136,9 +93,11 @@ print g2010_2012.num_edges()
 print "2013"
 print g2013.num_vertices()
 print g2013.num_edges()
-g.save("2010-2013.xml.gz")
+savegraph(g, "2010-2013.snap")
 
-g2010_2012.save("t2010-20125.xml.gz")
-g2013.save("t20135.xml.gz")
-smallg.save("tinyg5.xml.gz")
+savegraph(g2010_2012, "t2010-20125.snap")
+savegraph(g2013, "t20135.snap")
+savegraph(smallg, "tinyg5.snap")
+if profiling.enabled:
+  profiling.savereport("preparegraph.profile.json")
 graphviz_draw(smallg, ecolor=filteredgescolor(smallg, 2013, 2013))
@@ -0,0 +1,81 @@
+import functools
+import json
+import os
+import resource
+import time
+
+# set LP_PROFILE=1 in the environment, or call enable(), to record stages
+enabled = bool(os.environ.get("LP_PROFILE"))
+stages = {}
+
+
+def enable(on=True):
+  global enabled
+  enabled = on
+
+def reset():
+  stages.clear()
+
+def peakmemory():
+  '''Returns the peak resident memory of the process so far, in KB.'''
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def record(name, seconds, growth):
+  calls, total, largest = stages.get(name, (0, 0.0, 0))
+  stages[name] = (calls + 1, total + seconds, max(largest, growth))
+
+def merge(others):
+  '''Adds the stages recorded by another process, e.g. a worker.'''
+  for name, (calls, seconds, growth) in others.items():
+    total, totalseconds, largest = stages.get(name, (0, 0.0, 0))
+    stages[name] = (total + calls, totalseconds + seconds,
+                    max(largest, growth))
+
+def collect():
+  '''Returns the stages recorded so far and forgets them.'''
+  recorded = dict(stages)
+  reset()
+  return recorded
+
+def profiled(name):
+  '''Decorates a function to time each of its calls as the named stage.
+
+  While profiling is disabled, a call costs a single extra flag check.
+  '''
+  def decorate(f):
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+      if not enabled:
+        return f(*args, **kwargs)
+      start, peak = time.time(), peakmemory()
+      try:
+        return f(*args, **kwargs)
+      finally:
+        record(name, time.time() - start, peakmemory() - peak)
+    return wrapper
+  return decorate
+
+def report():
+  '''Returns the recorded stages as a JSON-ready dict.
+
+  Each stage gets its call count, its total wall time in seconds and its
+  "rssgrowth": the most a single call raised the peak resident memory of
+  its process, in KB. Memory the process had already peaked at before the
+  call is not counted again, so a stage reusing it shows little growth.
+  The top level "peakrss" is this process' own peak. Workers' stages are
+  only known once merged (see scheduler.scorerows).
+  '''
+  return {"stages": dict((name, {"calls": calls, "seconds": seconds,
+                                 "rssgrowth": growth})
+                         for name, (calls, seconds, growth) in stages.items()),
+          "peakrss": peakmemory()}
+
+def savereport(path=None):
+  '''Writes report() as JSON to path, or to stdout.'''
+  text = json.dumps(report(), indent=2, sort_keys=True,
+                    separators=(",", ": "))
+  if path is None:
+    print text
+  else:
+    with open(path, "w") as f:
+      f.write(text + "\n")
@@ -0,0 +1,50 @@
+import heapq
+
+
+class TopRank(object):
+  '''Keeps the k best scored (u, v) pairs seen so far.
+
+  Pairs are kept in a min-heap of size k, so pushing one costs O(log k)
+  and memory stays O(k) however many pairs are scored. Equal scores never
+  overwrite each other: when they compete for the last places, the lowest
+  (u, v) pairs win, so the outcome does not depend on the insertion order
+  nor on how the pairs were split between workers.
+
+  Attributes:
+    k: how many pairs are kept.
+    heap: the kept (score, -u, -v) entries, worst first.
+  '''
+
+  def __init__(self, k):
+    self.k = k
+    self.heap = []
+
+  def __len__(self):
+    return len(self.heap)
+
+  def __iter__(self):
+    return iter(self.ranked())
+
+  def push(self, score, u, v):
+    '''Offers the (u, v) pair with the given score.'''
+    if self.k <= 0:
+      return
+    entry = (score, -u, -v)
+    if len(self.heap) < self.k:
+      heapq.heappush(self.heap, entry)
+    elif entry > self.heap[0]:
+      heapq.heapreplace(self.heap, entry)
+
+  def extend(self, entries):
+    '''Offers every (score, u, v) entry of the given iterable.'''
+    for score, u, v in entries:
+      self.push(score, u, v)
+
+  def merge(self, rank):
+    '''Offers every pair kept by another TopRank.'''
+    for score, u, v in rank.heap:
+      self.push(score, -u, -v)
+
+  def ranked(self):
+    '''Returns the kept (score, u, v) entries, best first.'''
+    return [(score, -u, -v) for score, u, v in sorted(self.heap, reverse=True)]
@@ -1,9 +1,25 @@
 from graph_tool.all import *
 import timeit, random, collections
-from min_wis import WiSARD
+from min_wis import WiSARD, ArrayDiscriminator
 from encoding import BitStringEncoder
+from graphmatrices import multiplicitymatrix, decaymatrix
+from weightedpaths import weightedpathrow, EXACTLENGTH
+from batchscoring import scoregraph
+from neighbourhoods import NeighbourhoodIndex
+from distances import DistanceRows
+from ranking import TopRank
+from scheduler import Progress, rowweights, scorerows
+from signatures import thermometerpositions, SignatureStore
+from addressmatch import AddressMatcher
+from graphbuild import buildgraph
+from snapshot import loadgraph
+from evaluation import evaluate
+from collapsed import iscollapsed
+import profiling
+import os
 import math
 import time
+import functools
 
 def countweightedpaths(source, target, path, timetolive, pathcounter, lastyear):
   g = source.get_graph()
@@ -18,6 +34,22 @@ def countweightedpaths(source, target, path, timetolive, pathcounter, lastyear):
   thispath = list(path)
   #thispath = path
   thispath.append(source)
+  if iscollapsed(g):
+    # one edge per neighbour, standing for all the parallel ones, weighted
+    # for the year it was collapsed for, as in graphmatrices.decaymatrix
+    if g.graph_properties["lastyear"] != lastyear:
+      raise ValueError("graph weights are for %d, not %d" %
+                       (g.graph_properties["lastyear"], lastyear))
+    edgeweights = g.edge_properties["weight"]
+    multiplicities = g.edge_properties["multiplicity"]
+    weight = 0
+    for e in source.out_edges():
+      neighbour = e.target()
+      if neighbour == target and timetolive > 1:
+        continue
+      if neighbour not in thispath:
+        weight += multiplicities[e] * countweightedpaths(neighbour, target, thispath, timetolive-1, pathcounter + edgeweights[e], lastyear)
+    return weight
   edgeages = g.edge_properties["age"]
   weight = 0
   for neighbour in source.all_neighbours():
@@ -45,7 +77,11 @@ def verticesatdistance(graph, source, d, vertices):
 	verticesatdistance(g, neighbour, d-1, vertices)
 
 
-def evaluatemodifiedjaccard(graph, source, target, shortestdistance, d):
+def evaluatemodifiedjaccard(graph, source, target, shortestdistance, d, index=None):
+  # index: a NeighbourhoodIndex of graph, to look the balls up instead of
+  # searching them again for every pair
+  if index is not None:
+    return index.jaccard(source, target, shortestdistance)
   total = 0.0
   #shortestdistance = shortest_distance(source.get_graph(), source, target)
   #print shortestdistance
@@ -60,30 +96,61 @@ def evaluatemodifiedjaccard(graph, source, target, shortestdistance, d):
   #print intersection, union, float(intersection)/float(union)
   return float(intersection)/float(union)
 
-def evaluatepair(source, target, shortestdistance, d, baseyear):
+def evaluatepair(graph, source, target, shortestdistance, d, baseyear, paths=None, index=None):
+  # paths: the length 2..d path counts from source to target, already summed
+  # (see weightedpathrow). They are counted path by path when not given.
   i = 0
   value = 0.0
   powervalue = 0.0
-  jaccard = evaluatemodifiedjaccard(graph, source, target, shortestdistance, d)
+  jaccard = evaluatemodifiedjaccard(graph, source, target, shortestdistance, d, index)
+  if paths is not None:
+    return jaccard * paths
   for i in range(2, d+1):
     paths = countweightedpaths(source, target, list(), i, 0.0, baseyear)
     value += jaccard * paths
     #value += pow(jaccard, i) * pow(paths, i)
   return value#, powervalue
 
-def evaluategraph(g, d, rank):
+def pathscorer(g, d):
+  # row scorer of evaluategraph, pushing the pairs (u, v), v > u, into rank
   vertexindexes = g.vertex_properties["index"]
-  bestu = 0
-  bestv = 0
-  largestvalue = 0.0
-  for u in range(0, g.num_vertices()-1):
-    for v in range(u, g.num_vertices()):
-      shortestdistance = shortest_distance(g, g.vertex(u), g.vertex(v))
-      if shortestdistance > d or shortestdistance < 2:
-	continue
-      value = evaluatepair(g, g.vertex(u), g.vertex(v), shortestdistance, d, 2013)
-      rank[value] = (vertexindexes[g.vertex(u)],vertexindexes[g.vertex(v)])
+  multiplicities = multiplicitymatrix(g)
+  weights = decaymatrix(g, 2013)
+  index = NeighbourhoodIndex(g)
+  distances = DistanceRows(g, d)
+  def scorerow(u, rank):
+    # longer paths are only bounded by the row counts, count them one by one
+    paths = None
+    if d <= EXACTLENGTH:
+      paths = weightedpathrow(multiplicities, weights, u, d)
+    # only the targets 2..d hops away, out of a single BFS from u
+    targets, targetdistances = distances.candidates(u)
+    for v, shortestdistance in zip(targets, targetdistances):
+      v, shortestdistance = int(v), int(shortestdistance)
+      value = evaluatepair(g, g.vertex(u), g.vertex(v), shortestdistance, d, 2013,
+                           paths[v] if paths is not None else None, index)
+      rank.push(value, vertexindexes[g.vertex(u)], vertexindexes[g.vertex(v)])
       #print "(" + str(u) + "," + str(v) + ") = " + str(value) + "(" + str(shortestdistance) + ")"
+  return scorerow
+
+def evaluategraph(g, d, rank, vectorized=False, path=None, processes=None):
+  # path: where g is saved, to score its rows on several processes
+  if vectorized:
+    # all pairs at once with sparse products, see batchscoring.scoregraph
+    for u, v, value in scoregraph(g, d, 2013):
+      rank.push(value, u, v)
+    return
+  weights = rowweights(g)
+  if path is not None:
+    rank.merge(scorerows(path, functools.partial(pathscorer, d=d), rank.k,
+                         weights=weights, processes=processes)[0])
+    return
+  scorerow = pathscorer(g, d)
+  progress = Progress(weights)
+  for u in range(0, g.num_vertices()-1):
+    scorerow(u, rank)
+    progress.update(1, weights[u])
+  progress.update(0, 0, force=True)
 
 def mapfromindex(g):
   indexmap = {}
@@ -92,39 +159,17 @@ def mapfromindex(g):
     indexmap[vertexindexes[g.vertex(v)]] = v
   return indexmap
 
-def testresults(rank, g):
-  totaledges = g.num_edges()
-  i = 0
-  j = 0
-  hit = 0
-  randomhit = 0
-  vertexindexes = g.vertex_properties["index"]
-  indexmap = mapfromindex(g)
-  #print "SAFETY TEST: " + str(g.edge(g.vertex(indexmap[3442]), g.vertex(indexmap[24748])))
-  #print "SAFETY TEST: " + str(g.edge(g.vertex(indexmap[25988]), g.vertex(indexmap[47156])))
-  keylist = rank.keys()
-  keylist.sort()
-  keylist.reverse()
-  gcheck = load_graph("t2010-20125.xml.gz")
-  existing = 0
-  for k in keylist:
-    #print "(" + str(rank[k][0]) + ", " + str(rank[k][1]) + ") = " + str(k)
-    if i >= totaledges:
-      break
-    #print "edge(" + str(k[1][0]) + "," + str(k[1][1]) + "): " + str(g.edge(g.vertex(k[1][0]), g.vertex(k[1][1])))
-    i+=1
-    for e in gcheck.edge(g.vertex(rank[k][0]), g.vertex(rank[k][1]), all_edges=True):
-	existing += 1
-    if g.edge(g.vertex(rank[k][0]), g.vertex(rank[k][1])) is not None:
-	hit += 1
-    if g.edge(g.vertex(random.randint(0, g.num_vertices()-1)), g.vertex(random.randint(0, g.num_vertices()-1))):
-	randomhit += 1
-  print "Attempts: "+ str(i)
-  print "Predicted Hits: " + str(hit)
-  print "Existing Edges: " + str(existing)
-  print "Total edges: " + str(totaledges)
-  print "Accuracy: " + str(float(hit)*100/float(totaledges)) + "%%"
-  print "Random accuracy: " + str(float(randomhit)*100/float(totaledges)) + "%%"
+def testresults(rank, g, gtrain=None):
+  # g: the test graph, gtrain: the graph the predictions were made on
+  results = evaluate(rank, g, gtrain)
+  print "Attempts: "+ str(results["attempts"])
+  print "Predicted Hits: " + str(results["hits"])
+  print "Existing Edges: " + str(results["existing"])
+  print "Total edges: " + str(results["totaledges"])
+  print "Accuracy: " + str(float(results["hits"])*100/float(results["totaledges"])) + "%%"
+  print "Random accuracy: " + str(float(results["randomhits"])*100/float(results["totaledges"])) + "%%"
+  print "Precision@" + str(results["attempts"]) + ": " + str(results["precision"])
+  print "Top-k ranking AUC: " + str(results["rankauc"])
 
 def testWiSARD2(gprep, gtest):
     wisard = WiSARD()
@@ -152,11 +197,10 @@ def testWiSARD2(gprep, gtest):
 
 
 def generateRandomGraph(num_vertices, num_edges):
-    g = Graph()
-    for i in range(0, num_vertices):
-	g.add_vertex()
-    for i in range(0, num_edges):
-	g.add_edge(g.vertex(random.randint(0, num_vertices-1)), g.vertex(random.randint(0, num_vertices-1)))
+    # drawn in the same order, and directed, as when added edge by edge
+    endpoints = [random.randint(0, num_vertices-1) for _ in xrange(2*num_edges)]
+    g = buildgraph(endpoints[0::2], endpoints[1::2], n=num_vertices,
+                   directed=True)
     print "Random graph generated!"
     return g
 
@@ -169,20 +213,52 @@ def makeBitString(g, v, bits):
     bitstring = ""
     for u in g.vertices():
 	edges = 0
-	for e in g.edge(u, v, all_edges=True):
-	    edges = edges+1
+	if iscollapsed(g):
+	    e = g.edge(u, v)
+	    if e is not None:
+		edges = g.edge_properties["multiplicity"][e]
+	else:
+	    for e in g.edge(u, v, all_edges=True):
+		edges = edges+1
 	bitstring += thermometer(edges, bits)
     return bitstring
 
-def testWiSARD(u_bits, v_bits):
+def testWiSARD(u_bits, v_bits, encoder=None, length=None):
+    # with a length, u_bits and v_bits are the set bit positions of bit
+    # strings that long, mapped without ever building the strings
     wisard = WiSARD()
-    encoder = BitStringEncoder(len(u_bits)/64)
-    wisard.record(encoder(u_bits), "Edge")
-    u_v = wisard.answers(encoder(v_bits))
+    if length is None:
+	encoder = BitStringEncoder(len(u_bits)/64)
+	encode = encoder
+    else:
+	encoder = encoder or BitStringEncoder(length/64)
+	encode = lambda bits: encoder.map_positions(bits, length)
+    wisard.record(encode(u_bits), "Edge")
+    u_v = wisard.answers(encode(v_bits))
     return u_v.values()[0]
 
 
-def testPair(g, u, v, deg):
+def makeBitPositions(multiplicities, v, bits):
+    # the set bit positions of makeBitString(g, v, bits), from v's neighbours
+    return thermometerpositions(multiplicities, int(v), bits)
+
+
+def testPair(g, u, v, deg, multiplicities=None, encoder=None, store=None):
+    # multiplicities: multiplicitymatrix(g), to encode the thermometer rows
+    # from the neighbours of u and v with encoder instead of bit strings
+    # store: a SignatureStore holding the rows of every vertex, encoded once
+    if store is not None:
+	u_v = ArrayDiscriminator.compare(store[u], store[v])
+	v_u = ArrayDiscriminator.compare(store[v], store[u])
+	return int(u_v+v_u)
+    if multiplicities is not None:
+	length = g.num_vertices() * deg
+	u_bits = makeBitPositions(multiplicities, u, deg)
+	v_bits = makeBitPositions(multiplicities, v, deg)
+	u_v = testWiSARD(u_bits, v_bits, encoder, length)
+	v_u = testWiSARD(v_bits, u_bits, encoder, length)
+	return int(u_v+v_u)
+
     u_bits = makeBitString(g, u, deg)
     v_bits = makeBitString(g, v, deg)
 
@@ -193,56 +269,108 @@ def testPair(g, u, v, deg):
 
 
 
-def testPairs(g, gtest):
-    rank = {}
-    jaccardrank = {}
-    num_vertices = g.num_vertices()
+def maxdegree(g):
     max_deg = 0
-    for i in range(0, num_vertices):
+    for i in range(0, g.num_vertices()):
 	if g.vertex(i).out_degree() > max_deg:
 	    max_deg = g.vertex(i).out_degree()
-    print "Maximum degree: " + str(max_deg)
-    for u in range(0, num_vertices-1):
-	for v in range(u, num_vertices):
-	    if u == v:
-		continue
+    return max_deg
+
+def signaturestore(g, path=None):
+    # the vertex signatures of testPair, loaded from path when saved before
+    # for the same graph, encoded again otherwise
+    max_deg = maxdegree(g)
+    # a single mapping for the whole run: drawing one per pair costs as
+    # much as building the bit strings
+    encoder = BitStringEncoder(g.num_vertices() * max_deg / 64)
+    if path is not None and os.path.exists(path):
+	store = SignatureStore.load(path)
+	if store.matches(g, max_deg, encoder.nmbr_neurons):
+	    return store
+    return SignatureStore.encode(g, max_deg, encoder, path)
+
+def addressmatcher(g, signaturepath=None):
+    # the AddressMatcher of the vertex signatures, its ids saved next to
+    # them so that every worker maps the same file instead of numbering the
+    # addresses on its own
+    store = signaturestore(g, signaturepath)
+    if signaturepath is None:
+	return AddressMatcher.fromstore(store)
+    idspath = signaturepath + ".ids"
+    # signatures encoded again draw another mapping, even for the same graph
+    if os.path.exists(idspath) and \
+	    os.path.getmtime(idspath) >= os.path.getmtime(signaturepath):
+	matcher = AddressMatcher.load(idspath)
+	if matcher.meta == store.meta:
+	    return matcher
+    return AddressMatcher.fromstore(store, idspath)
+
+def wisardscorer(g, signaturepath=None):
+    # row scorer of testPairs, pushing the pairs (u, v), v > u, into the
+    # WiSARD and the Jaccard ranks
+    num_vertices = g.num_vertices()
+    max_deg = maxdegree(g)
+    index = NeighbourhoodIndex(g)
+    # scores a whole row at once, as testPair(g, u, v, max_deg, store=store)
+    matcher = addressmatcher(g, signaturepath)
+    def scorerow(u, rank, jaccardrank):
+	keys = matcher.row(u)
+	for v in range(u+1, num_vertices):
 	    #print makeBitString(g, g.vertex(u), 2) + "\n\n\n"
-	    key = testPair(g, g.vertex(u), g.vertex(v), max_deg)
-	    print "Testing pair " + str(u) + "," + str(v) + " = " + str(key)
-	    key = key * 100000
-	    while key in rank:
-		key = key+1
-	    jaccardscore = evaluatemodifiedjaccard(g, g.vertex(u), g.vertex(v), 1, 1)
-	    rank[key] = (u,v)
-	    jaccardrank[jaccardscore] = (u,v)
-    items = sorted(rank.items())
-    orderedrank = collections.OrderedDict(items, key=lambda t: t[0])
-    testresults(rank, gtest)
+	    key = int(keys[v-u-1])
+	    jaccardscore = evaluatemodifiedjaccard(g, g.vertex(u), g.vertex(v), 1, 1, index)
+	    rank.push(key, u, v)
+	    jaccardrank.push(jaccardscore, u, v)
+    return scorerow
+
+def testPairs(g, gtest, path=None, processes=None, signaturepath=None):
+    # path: where g is saved, to score its rows on several processes
+    # signaturepath: where the vertex signatures are kept between runs
+    # only the first num_edges predictions are ever checked
+    k = gtest.num_edges()
+    print "Maximum degree: " + str(maxdegree(g))
+    weights = rowweights(g)
+    if path is not None:
+	# encoded and numbered once here, then memory-mapped by every worker
+	signaturepath = signaturepath or path + ".signatures"
+	addressmatcher(g, signaturepath)
+	factory = functools.partial(wisardscorer, signaturepath=signaturepath)
+	rank, jaccardrank = scorerows(path, factory, k, 2,
+	                             weights=weights, processes=processes)
+    else:
+	rank = TopRank(k)
+	jaccardrank = TopRank(k)
+	scorerow = wisardscorer(g, signaturepath)
+	progress = Progress(weights)
+	for u in range(0, g.num_vertices()-1):
+	    scorerow(u, rank, jaccardrank)
+	    progress.update(1, weights[u])
+	progress.update(0, 0, force=True)
+    testresults(rank, gtest, g)
     print "JACCARD"
-    testresults(jaccardrank, gtest)
+    testresults(jaccardrank, gtest, g)
 
 
 
 def testMetrics():
-    gprep = load_graph("t2010-20125.xml.gz")
-    rank = {}
+    gprep = loadgraph("t2010-20125.snap")
+    gtest = loadgraph("t20135.snap")
+    rank = TopRank(gtest.num_edges())
     evaluategraph(gprep, 3, rank)
-    items = sorted(rank.items())
-    #items.reverse()
-    orderedrank = collections.OrderedDict(items, key=lambda t: t[0])
-    #print orderedrank
 
-    gtest = load_graph("t20135.xml.gz")
-    graphviz_draw(load_graph("t20135.xml.gz"))
+    graphviz_draw(loadgraph("t20135.snap"))
     #gtest
-    testresults(rank, gtest)
+    testresults(rank, gtest, gprep)
     #for e in gtest.edges():
     #print shortest_distance(gprep, gtest.vertex(e.source()), gtest.vertex(e.target()))
 
-start = time.time()
-gprep = load_graph("t2010-20125.xml.gz")
-gtest = load_graph("t20135.xml.gz")
-testPairs(gprep, gtest)
-end = time.time()
-print "Time elapsed: " + str(end-start)
-#testMetrics()
+if __name__ == "__main__":
+  start = time.time()
+  gprep = loadgraph("t2010-20125.snap")
+  gtest = loadgraph("t20135.snap")
+  testPairs(gprep, gtest, "t2010-20125.snap")
+  end = time.time()
+  print "Time elapsed: " + str(end-start)
+  if profiling.enabled:
+    profiling.savereport("rankpredictions.profile.json")
+  #testMetrics()
@@ -1,97 +1,22 @@
-import xml.etree.cElementTree as ET
-from collections import defaultdict
 from graph_tool.all import *
-filepath = "dblp3.xml"
-context = ET.iterparse(filepath, events = ("start", "end"))
-
-context = iter(context)
-onArticleTag = False
-currentArticle = ''
-currentYear = 0
-counter = 0
-d = defaultdict(list)
-authorlist = list()
-articleyears = {}
-for event, elem in context:
-  tag = elem.tag
-  value = elem.text  
-  if value:
-    value = value.encode('utf-8').strip()
-    
-  if event == 'start':
-    if tag == "article":
-      #print authorlist
-      if len(authorlist) > 1:
-	for k,v in authorlist:
-	  if articleyears[counter] is None:
-	    counter -= 1
-	    break
-	  d.setdefault(k, []).append(v)
-	authorlist = []
-	counter += 1
-	if not counter % 8524:
-	  print str(counter/8524) + "%"
-      #print "ARTICLE: %s" % currentArticle
-    elif tag == "author":
-      #print counter, value
-      authorlist.append((counter, value))
-      #print "(" + str(currentYear) + ")" + "On article " + str(currentArticle) + ": " + str(value)
-    elif tag == "title":
-      currentArticle = value
-    elif tag == "year":
-      currentYear = value
-      articleyears[counter] = value
-  elem.clear()
-
-print "Isolating repeated authors..."
-#isolates repeated authors
-authorset = set()
-for k in d:
-  for author in d[k]:
-    authorset.add(author)
-
-print "Creating int values for authors..."
-#creates int values for authors
-authorindexes = {}
-counter = 0
-for author in authorset:
-  authorindexes[author] = counter
-  counter += 1
-  
-#creates graph
-g = Graph()
-g.set_directed(False)
+from ingest import coauthorships
+from graphbuild import buildgraph
+from entities import EntityFilter
+from snapshot import savegraph
+import profiling
+filepath = "dblp.xml"
+
+print "Reading co-authorships..."
+#authors get their ids and edges their years in a single pass
+#entities are resolved on the fly, as recode.py would
+sources, targets, years, authors = coauthorships(EntityFilter(filepath))
+print "Authors: " + str(len(authors))
+
+print "Creating graph..."
+#creates graph with its vertices, edges and edge ages in bulk
+g = buildgraph(sources, targets, years, len(authors))
 g.set_fast_edge_removal()
-  
-print "Creating vertices..."
-#adds vertices
-for author in authorset:
-  g.add_vertex()
-print "Vertices created!"
-
-edgeages = g.new_edge_property("int")
-
-print "Creating edges..."
-#adds edges
-for articleindex in d:
-  year = articleyears[articleindex]
-  i = 0
-  j = 1
-  while j < len(d[articleindex]):
-    while i < j:
-      if articleyears[articleindex] is None:
-	break
-      u = authorindexes[d[articleindex][i]]
-      v = authorindexes[d[articleindex][j]]
-      g.add_edge(g.vertex(u), g.vertex(v))
-      
-      edgeages[g.edge(u,v)] = int(articleyears[articleindex])
-      #print str(articleyears[articleindex])
-      i += 1
-    j += 1
-
-print "Edges created!"
-g.edge_properties["age"] = edgeages
+print "Graph created!"
 
 print "Vertices: " + str(g.num_vertices())
 print "Edges: " + str(g.num_edges())
@@ -116,9 +41,11 @@ print "Vertices: " + str(g2.num_vertices())
 print "Edges: " + str(g2.num_edges())
 
 #.save("graph.xml.gz")
-g2.save("small.xml.gz")
+savegraph(g2, "small.snap")
 diameter, ends = pseudo_diameter(g2)
 print "Diameter: " + str(diameter)
+if profiling.enabled:
+  profiling.savereport("read.profile.json")
 
 #graph_draw(g2)
 #print d.items()
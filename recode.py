@@ -1,82 +1,5 @@
-fout = open("dblp3.xml", "wt")
-fin = open("dblp.xml", "rt")
-for line in fin:
-    line = line.replace('&uuml;', 'u')
-    line = line.replace('&auml;', 'a')
-    line = line.replace('&ouml;', 'o')
-    line = line.replace('&amp;', 'et')
-    line = line.replace('&szlig;', 'ss')
-    line = line.replace('&Auml;', 'A')
-    line = line.replace('&Ouml;', 'O')
-    line = line.replace('&Uuml;', 'U')
-    line = line.replace('&Aacute;', 'A')
-    line = line.replace('&Agrave;', 'A')
-    line = line.replace('&aacute;', 'a')
-    line = line.replace('&agrave;', 'a')
-    line = line.replace('&egrave;', 'e')
-    line = line.replace('&ograve;', 'o')
-    line = line.replace('&igrave;', 'i')
-    line = line.replace('&Eacute;', 'E')
-    line = line.replace('&eacute;', 'e')
-    line = line.replace('&Iacute;', 'I')
-    line = line.replace('&iacute;', 'i')
-    line = line.replace('&Oacute;', 'O')
-    line = line.replace('&oacute;', 'o')
-    line = line.replace('&Uacute;', 'U')
-    line = line.replace('&uacute;', 'u')
-    line = line.replace('&Oslash;', 'O')
-    line = line.replace('&oslash;', 'o')
-    line = line.replace('&micro;', 'u')
-    line = line.replace('&#091;', 'o')
-    line = line.replace('&#093;', 'o')
-    line = line.replace('&#956;', 'o')
-    line = line.replace('&#246;', 'o')
-    line = line.replace('&#937;', 'o')
-    line = line.replace('&#703;', 'o')
-    line = line.replace('&#949;', 'o')
-    line = line.replace('&#945;', 'o')
-    line = line.replace('&#945;', 'o')
-    line = line.replace('&#956;', 'o')
-    line = line.replace('&#960;', 'o')
-    line = line.replace('&#8242;', 'o')
-    line = line.replace('&#402;', 'o')
-    line = line.replace('&#923;', 'o')
-    line = line.replace('&#981;', 'o')
-    line = line.replace('&#176;', 'o')
-    line = line.replace('&#174;', 'o')
-    line = line.replace('&#954;', 'o')
-    line = line.replace('&#8201;', 'o')
-    line = line.replace('&#191;', 'o')
-    line = line.replace('&#931;', 'o')
-    line = line.replace('&#916;', 'o')
-    line = line.replace('&#8467;', 'o')
-    line = line.replace('&#8477;', 'o')
-    line = line.replace('&#948;', 'o')
-    line = line.replace('&#963;', 'o')
-    line = line.replace('&#8734;', 'o')
-    line = line.replace('&#8727;', 'o')
-    line = line.replace('&#936;', 'o')
-    line = line.replace('&#', 'o')
-    line = line.replace('&aelig;', 'ae')
-    line = line.replace('&yacute;', 'y')
-    line = line.replace('&Ccedil;', 'C')
-    line = line.replace('&ccedil;', 'c')
-    line = line.replace('&ntilde;', 'n')
-    line = line.replace('&atilde;', 'a')
-    line = line.replace('&acirc;', 'a')
-    line = line.replace('&aring;', 'a')
-    line = line.replace('&Aring;', 'A')
-    line = line.replace('&ETH;', 'E')
-    line = line.replace('&euml;', 'e')
-    line = line.replace('&yuml;', 'y')
-    line = line.replace('&ecirc;', 'e')
-    line = line.replace('&icirc;', 'i')
-    line = line.replace('&ocirc;', 'o')
-    line = line.replace('&iuml;', 'i')
-    line = line.replace('&eth;', 'e')
-    line = line.replace('&otilde;', 'o')
-    line = line.replace('&times;', 'x')
-    line = line.replace('&reg;', 'R')
-    line = line.replace('&gt;', 'o')
-    line = line.replace('&lt;', 'o')
-    fout.write(line)
+from entities import normalizefile
+
+# writes dblp.xml with its entities resolved, see entities.RULES; read.py
+# no longer needs this copy, as it normalizes dblp.xml while parsing it
+normalizefile("dblp.xml", "dblp3.xml", processes=4)
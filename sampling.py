@@ -0,0 +1,61 @@
+import numpy as np
+from distances import DistanceRows
+
+
+def vertexfilter(g, keep):
+  '''Returns a bool vertex property holding the given mask.'''
+  prop = g.new_vertex_property("bool")
+  prop.a[:] = keep
+  return prop
+
+def hub(g):
+  '''Returns the index of the highest degree vertex, the first one on ties.'''
+  return int(np.argmax(g.degree_property_map("out").a[:g.num_vertices()]))
+
+def hubdistances(g, maxdistance=6):
+  '''Returns the distance from the hub to every vertex, found by one BFS.
+
+  Vertices further than maxdistance hops, or unreachable, get -1.
+  '''
+  return DistanceRows(g, maxdistance).row(hub(g))
+
+def draw(g, p, seed=None):
+  '''Returns the filter marking each vertex with its probability in p.
+
+  The draws all come from one RandomState(seed) call, so a given seed
+  always marks the same vertices. Vertex v is marked when p[v] beats its
+  uniform draw, as preparegraph's samplers did one vertex at a time.
+  '''
+  uniform = np.random.RandomState(seed).uniform(0, 1, g.num_vertices())
+  return vertexfilter(g, p > uniform)
+
+def uniformsample(g, p, seed=None):
+  '''Returns the filter marking each vertex with probability p.'''
+  return draw(g, np.repeat(float(p), g.num_vertices()), seed)
+
+def distancesample(g, scale=0.3, exponent=3, maxdistance=6, seed=None):
+  '''Returns the filter marking vertices less likely further from the hub.
+
+  A vertex d hops away from the hub is marked with probability
+  scale / d**exponent, the hub always and the vertices beyond maxdistance
+  never.
+  '''
+  distances = hubdistances(g, maxdistance).astype(np.float64)
+  p = np.zeros(len(distances))
+  near = distances > 0
+  p[near] = scale / distances[near] ** exponent
+  p[distances == 0] = 1.0
+  return draw(g, p, seed)
+
+def snowballsample(g, size, start=None, seed=None):
+  '''Returns the filter marking the size vertices closest to start.
+
+  The vertices are taken in BFS order from start, a random vertex unless
+  given, so the sample is as connected as the graph around it allows.
+  '''
+  if start is None:
+    start = np.random.RandomState(seed).randint(g.num_vertices())
+  vertices, _ = DistanceRows(g, g.num_vertices()).reach(start)
+  keep = np.zeros(g.num_vertices(), dtype=bool)
+  keep[vertices[:size]] = True
+  return vertexfilter(g, keep)
@@ -0,0 +1,105 @@
+import multiprocessing
+import sys
+import time
+import numpy as np
+import profiling
+from ranking import TopRank
+from snapshot import loadgraph
+
+# the row scorer each worker built out of its own copy of the graph
+rowscorer = None
+
+
+class Progress(object):
+  '''Reports how many source rows were scored, at most once per interval.
+
+  Each report tells the rows and pairs done so far, the elapsed time and
+  an estimate of the time left, weighting rows by their estimated work.
+  '''
+
+  def __init__(self, weights, interval=10.0, out=sys.stdout):
+    self.total = float(np.sum(weights)) or 1.0
+    self.rows = len(weights)
+    self.interval = interval
+    self.out = out
+    self.done = 0.0
+    self.donerows = 0
+    self.start = self.last = time.time()
+
+  def update(self, rows, work, force=False):
+    '''Accounts for rows more scored rows, worth work of the total work.'''
+    self.donerows += rows
+    self.done += work
+    now = time.time()
+    if not force and now - self.last < self.interval:
+      return
+    self.last = now
+    elapsed = now - self.start
+    left = elapsed * (self.total - self.done) / self.done if self.done else 0.0
+    print >> self.out, "Scored %d/%d rows (%.1f%%) in %.0fs, %.0fs left" % (
+        self.donerows, self.rows, 100.0 * self.done / self.total, elapsed, left)
+    self.out.flush()
+
+def rowweights(g):
+  '''Returns the estimated work of scoring each source row of g.
+
+  Row u of the u < v loops holds n-u-1 pairs, each costing about the
+  degree of u, so high degree rows early on weigh the most.
+  '''
+  n = g.num_vertices()
+  degrees = g.degree_property_map("out").a[:n].astype(np.float64)
+  return (degrees + 1.0) * (n - 1 - np.arange(n))
+
+def balancedchunks(weights, chunks):
+  '''Splits range(len(weights)) into contiguous chunks of about equal weight.'''
+  cumulative = np.cumsum(weights)
+  cuts = cumulative[-1] * np.arange(1, chunks) / float(chunks)
+  bounds = np.unique(np.concatenate(
+      ([0], np.searchsorted(cumulative, cuts) + 1, [len(weights)])))
+  return [np.arange(start, end) for start, end in zip(bounds[:-1], bounds[1:])
+          if start < end]
+
+def initworker(path, factory):
+  global rowscorer
+  profiling.reset()  # forked along with the parent's stages
+  rowscorer = factory(loadgraph(path))
+
+def scorechunk(task):
+  rows, k, rankings = task
+  ranks = [TopRank(k) for _ in xrange(rankings)]
+  for u in rows:
+    rowscorer(int(u), *ranks)
+  # the stages this worker ran for the chunk, for the parent to report
+  return rows, ranks, profiling.collect()
+
+def scorerows(path, factory, k, rankings=1, weights=None, processes=None,
+              chunks=None, interval=10.0):
+  '''Scores the source rows of the graph saved at path on several processes.
+
+  Each worker loads the graph once and builds its row scorer with
+  factory(g); rowscorer(u, *ranks) must push the scores of the pairs of
+  row u into the given TopRanks. Rows are split into contiguous chunks of
+  about equal estimated work (rowweights by default), and the per chunk
+  ranks are merged as the chunks come back, along with the profiling
+  stages the workers ran.
+
+  Returns the list of the rankings merged TopRanks, each keeping k pairs.
+  '''
+  processes = processes or multiprocessing.cpu_count()
+  if weights is None:
+    weights = rowweights(loadgraph(path))
+  tasks = [(rows, k, rankings)
+           for rows in balancedchunks(weights, chunks or processes * 8)]
+  ranks = [TopRank(k) for _ in xrange(rankings)]
+  progress = Progress(weights, interval)
+  pool = multiprocessing.Pool(processes, initworker, (path, factory))
+  try:
+    for rows, chunkranks, stages in pool.imap_unordered(scorechunk, tasks):
+      for rank, chunkrank in zip(ranks, chunkranks):
+        rank.merge(chunkrank)
+      profiling.merge(stages)
+      progress.update(len(rows), np.sum(weights[rows]))
+  finally:
+    pool.terminate()
+  progress.update(0, 0, force=True)
+  return ranks
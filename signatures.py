@@ -0,0 +1,109 @@
+import hashlib
+import numpy as np
+from arrayfile import savearrays, loadarrays
+from encoding import key_view
+from graphmatrices import multiplicitymatrix
+from profiling import profiled
+
+
+def thermometerpositions(multiplicities, v, bits):
+  '''Returns the positions of the set bits of makeBitString(g, v, bits).
+
+  The bit string holds a bits long thermometer field per vertex w, whose
+  last min(m, bits) bits are set, m being the number of edges between v
+  and w. Only v's neighbours have set bits, so the positions come straight
+  from its row of multiplicitymatrix(g) in O(deg).
+  '''
+  start, end = multiplicities.indptr[v], multiplicities.indptr[v+1]
+  neighbours = multiplicities.indices[start:end].astype(np.int64)
+  counts = np.minimum(multiplicities.data[start:end], bits).astype(np.int64)
+  firsts = (neighbours + 1) * bits - counts
+  offsets = np.cumsum(counts) - counts
+  return np.repeat(firsts - offsets, counts) + np.arange(counts.sum())
+
+def describe(multiplicities, bits, neurons):
+  '''Returns what a SignatureStore of the given graph matrix depends on.
+
+  Besides the sizes, the dict holds a digest of the CSR arrays of
+  multiplicitymatrix(g), which tells apart graphs of the same size.
+  '''
+  digest = hashlib.sha1()
+  for array in (multiplicities.indptr, multiplicities.indices,
+                multiplicities.data):
+    digest.update(np.ascontiguousarray(array).tostring())
+  return {"vertices": multiplicities.shape[0], "bits": int(bits),
+          "neurons": int(neurons), "graph": digest.hexdigest()}
+
+
+class SignatureStore(object):
+  '''The thermometer rows of every vertex, encoded once into address keys.
+
+  Rows are encoded with a fixed BitStringEncoder and kept in a contiguous
+  n x neurons x words array of uint64, words being how many 64 bits words
+  the widest address needs. store[v] is a view of v's keys (see
+  encoding.key_view), so the pair loops read them without any copy. The
+  array can be saved and memory-mapped back by later runs, which should
+  check with matches that it was encoded from their graph.
+
+  Attributes:
+    words: the n x neurons x words array of address words.
+    keys: the n x neurons array of address keys viewing words.
+    meta: the describe dict of what the rows were encoded from.
+  '''
+
+  def __init__(self, words, meta=None):
+    self.words = words
+    self.keys = key_view(words)
+    self.meta = meta or {}
+
+  def __len__(self):
+    return len(self.keys)
+
+  def __getitem__(self, v):
+    return self.keys[int(v)]
+
+  def matches(self, g, bits, neurons):
+    '''Tells whether the store holds the rows encode(g, bits, ...) gives.'''
+    return self.meta == describe(multiplicitymatrix(g), bits, neurons)
+
+  @classmethod
+  @profiled("encoding")
+  def encode(cls, g, bits, encoder, path=None):
+    '''Encodes the thermometer rows makeBitString(g, v, bits) of g.
+
+    When a path is given, the store is saved there and memory-mapped back.
+    An encoder without neurons, as BitStringEncoder(length/64) is for
+    strings shorter than 64 bits, gives every vertex an empty signature,
+    so every pair scores 0.
+    '''
+    multiplicities = multiplicitymatrix(g)
+    n = g.num_vertices()
+    length = n * bits
+    neurons = encoder.nmbr_neurons
+    if neurons > 1:
+      encoder.map_positions([], length)  # defines the mapping if needed
+      reverse = np.asarray(encoder.get_reverse_mapping(), dtype=np.int64)
+    nwords = (encoder.address_bits(length) + 63) / 64 if neurons else 1
+    words = np.zeros((n, neurons, nwords), dtype=np.uint64)
+    for v in xrange(n if neurons else 0):
+      positions = thermometerpositions(multiplicities, v, bits)
+      if neurons > 1:
+        mapped = reverse[positions]
+        cells = mapped % neurons
+        shifts = (length - cells - 1) / neurons - mapped / neurons
+      else:
+        cells = np.zeros(len(positions), dtype=np.int64)
+        shifts = length - 1 - positions
+      ones = np.left_shift(np.uint64(1), (shifts % 64).astype(np.uint64))
+      np.bitwise_or.at(words[v], (cells, shifts / 64), ones)
+    meta = describe(multiplicities, bits, neurons)
+    if path is None:
+      return cls(words, meta)
+    savearrays(path, {"words": words}, meta)
+    return cls.load(path)
+
+  @classmethod
+  def load(cls, path):
+    '''Memory-maps the store saved at path.'''
+    arrays, meta = loadarrays(path)
+    return cls(arrays["words"], meta)
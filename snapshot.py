@@ -0,0 +1,99 @@
+import numpy as np
+from arrayfile import savearrays, loadarrays
+from collapsed import EDGEPROPERTIES
+from graphbuild import buildgraph
+from graphmatrices import edgearrays
+
+
+class Snapshot(object):
+  '''A co-authorship graph held as memory-mapped CSR arrays.
+
+  Each edge is kept once, in the row of its source vertex.
+
+  Attributes:
+    indptr, indices: the CSR arrays of the edges.
+    ages: the "age" of each edge, in the order of indices.
+    index: the "index" vertex property, or None.
+    edgeproperties: the properties of a collapsed graph's edges, by name,
+      in the order of indices (see collapsed.collapsegraph).
+    lastyear: the year a collapsed graph's "weight" is for, or None.
+    directed: whether the graph is directed.
+    meta: the meta dict saved along with the arrays.
+  '''
+
+  def __init__(self, arrays, meta=None):
+    self.indptr = arrays["indptr"]
+    self.indices = arrays["indices"]
+    self.ages = arrays.get("ages")
+    self.index = arrays.get("index")
+    self.edgeproperties = dict((name, arrays[name])
+                               for name, _ in EDGEPROPERTIES if name in arrays)
+    self.meta = meta or {}
+    self.lastyear = self.meta.get("lastyear")
+    self.directed = bool(self.meta.get("directed", False))
+
+  def num_vertices(self):
+    return len(self.indptr) - 1
+
+  def num_edges(self):
+    return len(self.indices)
+
+  def graph(self):
+    '''Builds the graph-tool graph, with its "age" and "index" properties.
+
+    A collapsed graph gets its edge properties and lastyear back too.
+    '''
+    sources = np.repeat(np.arange(self.num_vertices()), np.diff(self.indptr))
+    g = buildgraph(sources, self.indices, self.ages, self.num_vertices(),
+                   directed=self.directed)
+    for name, valuetype in EDGEPROPERTIES:
+      if name in self.edgeproperties:
+        prop = g.new_edge_property(valuetype)
+        prop.a[:] = self.edgeproperties[name]
+        g.edge_properties[name] = prop
+    if self.lastyear is not None:
+      g.graph_properties["lastyear"] = g.new_graph_property("int")
+      g.graph_properties["lastyear"] = self.lastyear
+    if self.index is not None:
+      index = g.new_vertex_property("int")
+      index.a[:] = self.index
+      g.vertex_properties["index"] = index
+    return g
+
+def savegraph(g, path):
+  '''Saves g, or the graph seen through a view of it, as a snapshot.
+
+  Filtered out vertices are dropped and the others renumbered in order.
+  '''
+  sources, targets, edgeindexes = edgearrays(g)
+  vertices = np.arange(g.num_vertices())
+  vertexfilter, inverted = g.get_vertex_filter()
+  if vertexfilter is not None:
+    keep = vertexfilter.a.astype(bool) != bool(inverted)
+    vertices = np.flatnonzero(keep)
+    renumbered = np.cumsum(keep) - 1
+    sources, targets = renumbered[sources], renumbered[targets]
+  order = np.argsort(sources, kind="mergesort")
+  arrays = {"indptr": np.concatenate(
+                ([0], np.cumsum(np.bincount(sources, minlength=len(vertices))))),
+            "indices": targets[order].astype(np.int32)}
+  if "age" in g.edge_properties:
+    arrays["ages"] = g.edge_properties["age"].a[edgeindexes][order].astype(np.int32)
+  if "index" in g.vertex_properties:
+    arrays["index"] = g.vertex_properties["index"].a[vertices].astype(np.int32)
+  meta = {"directed": bool(g.is_directed())}
+  for name, _ in EDGEPROPERTIES:
+    if name in g.edge_properties:
+      arrays[name] = g.edge_properties[name].a[edgeindexes][order]
+  if "lastyear" in g.graph_properties:
+    meta["lastyear"] = int(g.graph_properties["lastyear"])
+  savearrays(path, arrays, meta)
+
+def loadsnapshot(path):
+  '''Memory-maps the snapshot saved at path.'''
+  arrays, meta = loadarrays(path)
+  return Snapshot(arrays, meta)
+
+def loadgraph(path):
+  '''Loads the graph saved at path, in place of load_graph.'''
+  return loadsnapshot(path).graph()
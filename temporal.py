@@ -0,0 +1,32 @@
+from graph_tool.all import GraphView
+from profiling import profiled
+
+
+@profiled("filtering")
+def yearmask(g, fromyear, toyear):
+  '''Returns the edge filter of the edges aged fromyear..toyear.
+
+  The filter is computed from the whole "age" array in one go.
+  '''
+  ages = g.edge_properties["age"].a
+  mask = g.new_edge_property("bool")
+  mask.a[:] = (ages >= fromyear) & (ages <= toyear)
+  return mask
+
+def temporalsplit(g, windows):
+  '''Returns a view of g per (fromyear, toyear) window, in the same order.
+
+  The views share g's vertices and storage, only filtering its edges, so
+  nothing is copied nor purged; each view costs one array comparison.
+  '''
+  return [GraphView(g, efilt=yearmask(g, fromyear, toyear))
+          for fromyear, toyear in windows]
+
+def traintestsplit(g, lastyear, firsttrainyear=None):
+  '''Returns the views of g up to lastyear and of the years after it.
+
+  The training view starts at firsttrainyear, when given.
+  '''
+  ages = g.edge_properties["age"].a
+  first = ages.min() if firsttrainyear is None else firsttrainyear
+  return temporalsplit(g, [(first, lastyear), (lastyear + 1, ages.max())])
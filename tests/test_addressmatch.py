@@ -0,0 +1,84 @@
+'''Checks the address-match kernel against testPair and a plain TopRank.
+
+Run from the repository root with python -m unittest discover tests.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from addressmatch import AddressMatcher
+from encoding import BitStringEncoder
+from graphbuild import buildgraph
+from graphmatrices import multiplicitymatrix
+from ranking import TopRank
+from rankpredictions import addressmatcher, maxdegree, testPair
+from signatures import SignatureStore
+
+
+def randomgraph(random, n):
+  m = random.randint(n, 3*n)
+  sources = random.randint(0, n, m)
+  targets = random.randint(0, n, m)
+  loopless = sources != targets
+  return buildgraph(sources[loopless], targets[loopless], n=n)
+
+
+class AddressMatcherTest(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def graphs(self):
+    random = np.random.RandomState(3)
+    # from no neuron at all up to several of them
+    return [randomgraph(random, n) for n in (5, 20, 40, 60)]
+
+  def test_row_matches_testpair(self):
+    for g in self.graphs():
+      n = g.num_vertices()
+      bits = maxdegree(g)
+      encoder = BitStringEncoder(n * bits / 64)
+      store = SignatureStore.encode(g, bits, encoder)
+      multiplicities = multiplicitymatrix(g)
+      matcher = AddressMatcher.fromstore(store)
+      for u in xrange(n-1):
+        row = matcher.row(u)
+        self.assertEqual(len(row), n-u-1)
+        for v in xrange(u+1, n):
+          self.assertEqual(row[v-u-1], testPair(g, u, v, bits, store=store))
+          if encoder.nmbr_neurons:
+            self.assertEqual(row[v-u-1], testPair(g, u, v, bits,
+                                                  multiplicities, encoder))
+
+  def test_saved_ids(self):
+    for g in self.graphs():
+      path = os.path.join(self.directory, "g.signatures")
+      saved = addressmatcher(g, path)
+      loaded = addressmatcher(g, path)
+      self.assertEqual(loaded.meta, saved.meta)
+      store = SignatureStore.load(path)
+      expected = AddressMatcher.fromstore(store)
+      self.assertTrue(np.array_equal(loaded.ids, expected.ids))
+
+  def test_rankpairs(self):
+    for g in self.graphs():
+      n = g.num_vertices()
+      bits = maxdegree(g)
+      matcher = AddressMatcher.fromstore(
+          SignatureStore.encode(g, bits, BitStringEncoder(n * bits / 64)))
+      for k in (0, 1, 7, n*n):
+        expected = TopRank(k)
+        for u in xrange(n-1):
+          for v, score in zip(xrange(u+1, n), matcher.row(u)):
+            expected.push(int(score), u, v)
+        rank = TopRank(k)
+        matcher.rankpairs(rank, blocksize=8)
+        self.assertEqual(rank.ranked(), expected.ranked())
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,77 @@
+'''Checks the single scan entity resolution against recode.py's replaces.
+
+Run from the repository root with python -m unittest discover tests.
+'''
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from entities import RULES, chained, cascades, normalize, EntityFilter, \
+    normalizefile
+
+# pieces of entities, mostly, so that random texts cascade often
+FRAGMENTS = [pattern for pattern, _ in RULES] + [
+    '&', ';', '#', 'a', 'e', 'h', 'o', 't', 'r', ' ', '\n', 'uml;', 'amp;',
+    'cute;', 'th;', 'ring;', '&#0', '91;']
+
+
+def fragments(random, count):
+  return ''.join(random.choice(FRAGMENTS) for _ in xrange(count))
+
+def recoded(text):
+  '''Returns text as recode.py writes it, replacing line by line.'''
+  return ''.join(chained(line) for line in text.splitlines(True))
+
+
+class EntitiesTest(unittest.TestCase):
+
+  def setUp(self):
+    self.random = random.Random(5)
+    self.directory = tempfile.mkdtemp()
+    self.source = os.path.join(self.directory, "in.xml")
+    text = ''.join(fragments(self.random, 20) + '\n' for _ in xrange(5000))
+    with open(self.source, "wb") as f:
+      f.write(text)
+    self.expected = recoded(text)
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def test_cascades(self):
+    self.assertTrue(cascades('&&amp;h;'))
+    self.assertEqual(normalize('&&amp;h;'), 'e')
+    self.assertEqual(normalize('&&amp;h;'), chained('&&amp;h;'))
+    self.assertFalse(cascades('&amp; &uuml;'))
+
+  def test_random_texts(self):
+    fallbacks = 0
+    for _ in xrange(50000):
+      text = fragments(self.random, self.random.randint(0, 12))
+      self.assertEqual(normalize(text), recoded(text), repr(text))
+      fallbacks += cascades(text)
+    # the chained fallback must have been exercised too
+    self.assertTrue(fallbacks)
+
+  def test_filter_small_reads(self):
+    entityfilter = EntityFilter(self.source, chunksize=1000)
+    data = []
+    while True:
+      chunk = entityfilter.read(777)
+      if not chunk:
+        break
+      data.append(chunk)
+    entityfilter.close()
+    self.assertEqual(''.join(data), self.expected)
+    self.assertEqual(EntityFilter(self.source).read(), self.expected)
+
+  def test_normalizefile(self):
+    destination = os.path.join(self.directory, "out.xml")
+    for processes in (1, 3):
+      normalizefile(self.source, destination, processes, chunksize=5000)
+      with open(destination, "rb") as f:
+        self.assertEqual(f.read(), self.expected)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,103 @@
+'''Checks incremental rescoring against scoring the grown graph again.
+
+Run from the repository root with python -m unittest discover tests.
+'''
+import unittest
+import numpy as np
+from graphbuild import buildgraph
+from graphmatrices import multiplicitymatrix, decaymatrix
+from weightedpaths import weightedpathrow
+from neighbourhoods import NeighbourhoodIndex
+from distances import DistanceRows
+from incremental import IncrementalScorer
+from ranking import TopRank
+from rankpredictions import pathscorer
+
+
+def indexedgraph(sources, targets, years, n):
+  g = buildgraph(sources, targets, years, n)
+  indexes = g.new_vertex_property("int")
+  indexes.a[:] = np.arange(n)
+  g.vertex_properties["index"] = indexes
+  return g
+
+def randomedges(random, n, m, years):
+  sources = random.randint(0, n, m)
+  targets = random.randint(0, n, m)
+  loopless = sources != targets
+  sources, targets = sources[loopless], targets[loopless]
+  return sources, targets, random.randint(years[0], years[1]+1, len(sources))
+
+def fullscores(g, d, lastyear):
+  '''Scores every candidate pair of g from scratch, as pathscorer does.'''
+  multiplicities = multiplicitymatrix(g)
+  weights = decaymatrix(g, lastyear)
+  index = NeighbourhoodIndex(g)
+  distances = DistanceRows(g, d)
+  scores = {}
+  for u in xrange(g.num_vertices() - 1):
+    paths = weightedpathrow(multiplicities, weights, u, d)
+    for v, distance in zip(*distances.candidates(u)):
+      scores[u, int(v)] = index.jaccard(u, v, distance) * paths[v]
+  return scores
+
+def incrementalscores(scorer):
+  scores = {}
+  for u in xrange(scorer.n - 1):
+    for v, score in zip(*scorer.rowscores(u)):
+      scores[u, int(v)] = score
+  return scores
+
+
+class IncrementalScorerTest(unittest.TestCase):
+
+  def assertSameScores(self, scores, expected):
+    self.assertEqual(sorted(scores), sorted(expected))
+    for pair, score in expected.items():
+      self.assertAlmostEqual(scores[pair], score, places=9)
+
+  def test_addedges(self):
+    d = 3
+    for seed in xrange(5):
+      random = np.random.RandomState(seed)
+      n = 40 + 5*seed
+      sources, targets, years = randomedges(random, n, 2*n, (2010, 2012))
+      scorer = IncrementalScorer(indexedgraph(sources, targets, years, n), d,
+                                 2012)
+      self.assertSameScores(incrementalscores(scorer), fullscores(
+          indexedgraph(sources, targets, years, n), d, 2012))
+      # new edges may bring new vertices along
+      for lastyear in (2013, 2014):
+        new = randomedges(random, n + 3, 6, (lastyear, lastyear))
+        scorer.addedges(*new, lastyear=lastyear)
+        sources, targets, years = [np.concatenate(arrays)
+                                   for arrays in zip((sources, targets, years),
+                                                     new)]
+        n = max(n, int(max(sources.max(), targets.max())) + 1)
+        self.assertSameScores(incrementalscores(scorer), fullscores(
+            indexedgraph(sources, targets, years, n), d, lastyear))
+
+  def test_rank_matches_pathscorer(self):
+    # pathscorer always weighs the edges for 2013
+    random = np.random.RandomState(7)
+    n = 50
+    sources, targets, years = randomedges(random, n, 100, (2010, 2012))
+    scorer = IncrementalScorer(indexedgraph(sources, targets, years, n), 3,
+                               2012)
+    new = randomedges(random, n, 8, (2013, 2013))
+    scorer.addedges(*new, lastyear=2013)
+    g = indexedgraph(*[np.concatenate(arrays) for arrays in
+                       zip((sources, targets, years), new)] + [n])
+    expected = TopRank(40)
+    scorerow = pathscorer(g, 3)
+    for u in xrange(n - 1):
+      scorerow(u, expected)
+    # pairs could swap places on scores equal but for rounding
+    scores = [score for score, _, _ in scorer.rank(40)]
+    self.assertEqual(len(scores), len(expected))
+    for score, (other, _, _) in zip(scores, expected):
+      self.assertAlmostEqual(score, other, places=9)
+
+
+if __name__ == "__main__":
+  unittest.main()
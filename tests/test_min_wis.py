@@ -0,0 +1,93 @@
+'''Checks that saved WiSARD models load back answering the same.
+
+Run from the repository root with python -m unittest discover tests.
+'''
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from encoding import BitStringEncoder
+from min_wis import WiSARD, Discriminator, ArrayDiscriminator
+
+
+def bitstring(random, length):
+  return ''.join(random.choice('0001') for _ in xrange(length))
+
+
+class SaveLoadTest(unittest.TestCase):
+
+  def setUp(self):
+    self.random = random.Random(11)
+    self.directory = tempfile.mkdtemp()
+    self.path = os.path.join(self.directory, "model.lpm")
+
+  def tearDown(self):
+    shutil.rmtree(self.directory)
+
+  def observations(self, encoder, count, length):
+    return [encoder(bitstring(self.random, length)) for _ in xrange(count)]
+
+  def checkwisard(self, discriminator, neurons, length):
+    # a few neurons on long strings give addresses wider than 64 bits
+    encoder = BitStringEncoder(neurons)
+    wisard = WiSARD(discriminator)
+    for class_ in ("yes", "no", 3):
+      for observation in self.observations(encoder, 5, length):
+        wisard.record(observation, class_)
+      # recorded twice, so the counts differ between addresses
+      wisard.record(observation, class_)
+    wisard.save(self.path, encoder)
+    loaded, loadedencoder = WiSARD.load(self.path)
+    self.assertEqual(loadedencoder.mapping, encoder.mapping)
+    self.assertEqual(sorted(loaded.discriminators),
+                     sorted(wisard.discriminators))
+    tests = self.observations(encoder, 10, length) + [observation]
+    for test in tests:
+      self.assertEqual(loaded.answers(test), wisard.answers(test))
+      self.assertEqual(loaded.counts(test), wisard.counts(test))
+    self.assertEqual(loaded.answers_many(tests).tolist(),
+                     wisard.answers_many(tests).tolist())
+    # loaded models keep learning like the saved ones
+    for test in tests[:3]:
+      loaded.record(test, "yes")
+      wisard.record(test, "yes")
+    for test in tests:
+      self.assertEqual(loaded.answers(test), wisard.answers(test))
+      self.assertEqual(loaded.counts(test), wisard.counts(test))
+    return loaded
+
+  def test_wisard(self):
+    for neurons, length in ((32, 128), (8, 256), (2, 300)):
+      loaded = self.checkwisard(Discriminator, neurons, length)
+      self.assertFalse(isinstance(loaded.discriminators["yes"],
+                                  ArrayDiscriminator))
+
+  def test_array_wisard(self):
+    for neurons, length in ((32, 128), (8, 256), (2, 300)):
+      loaded = self.checkwisard(ArrayDiscriminator, neurons, length)
+      self.assertTrue(isinstance(loaded.discriminators["yes"],
+                                 ArrayDiscriminator))
+
+  def test_discriminator(self):
+    encoder = BitStringEncoder(16)
+    discriminator = Discriminator()
+    for observation in self.observations(encoder, 8, 512):
+      discriminator.record(observation)
+    discriminator.save(self.path)
+    loaded, loadedencoder = Discriminator.load(self.path)
+    self.assertTrue(loadedencoder is None)
+    for test in self.observations(encoder, 10, 512) + [observation]:
+      self.assertEqual(loaded.answer(test), discriminator.answer(test))
+      self.assertEqual(loaded.counts(test), discriminator.counts(test))
+
+  def test_labels(self):
+    encoder = BitStringEncoder(4)
+    wisard = WiSARD()
+    wisard.record(encoder(bitstring(self.random, 64)), ("u", "v"))
+    self.assertRaises(TypeError, wisard.save, self.path, encoder)
+    self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+  unittest.main()
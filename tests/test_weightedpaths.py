@@ -0,0 +1,80 @@
+'''Checks the vectorized path counts against countweightedpaths.
+
+Run from the repository root with python -m unittest discover tests.
+'''
+import unittest
+import numpy as np
+from graphbuild import buildgraph
+from graphmatrices import multiplicitymatrix, decaymatrix
+from weightedpaths import EXACTLENGTH, weightedpathcounts, weightedpathrow
+from batchscoring import scoregraph
+from distances import DistanceRows
+from neighbourhoods import NeighbourhoodIndex
+from incremental import IncrementalScorer
+from ranking import TopRank
+from rankpredictions import countweightedpaths, evaluatepair, pathscorer
+
+
+def randomgraph(random, n):
+  '''Returns a random loopless multigraph on n vertices, with an "index".'''
+  m = random.randint(n, 3*n)
+  sources = random.randint(0, n, m)
+  targets = random.randint(0, n, m)
+  loopless = sources != targets
+  sources, targets = sources[loopless], targets[loopless]
+  g = buildgraph(sources, targets, random.randint(2009, 2014, len(sources)), n)
+  indexes = g.new_vertex_property("int")
+  indexes.a[:] = np.arange(n)
+  g.vertex_properties["index"] = indexes
+  return g
+
+
+class WeightedPathsTest(unittest.TestCase):
+
+  def graphs(self, count=20):
+    random = np.random.RandomState(0)
+    return [randomgraph(random, random.randint(3, 10)) for _ in xrange(count)]
+
+  def test_exact_lengths(self):
+    for g in self.graphs():
+      n = g.num_vertices()
+      paths = weightedpathcounts(multiplicitymatrix(g), decaymatrix(g, 2013),
+                                 np.arange(n), EXACTLENGTH)
+      for length in xrange(2, EXACTLENGTH+1):
+        for s in xrange(n):
+          for t in xrange(n):
+            expected = countweightedpaths(g.vertex(s), g.vertex(t), [],
+                                          length, 0.0, 2013)
+            self.assertAlmostEqual(paths[length][s, t], expected, places=9)
+
+  def test_longer_lengths_refused(self):
+    g = self.graphs(1)[0]
+    multiplicities = multiplicitymatrix(g)
+    weights = decaymatrix(g, 2013)
+    weightedpathrow(multiplicities, weights, 0, EXACTLENGTH)
+    self.assertRaises(ValueError, weightedpathrow, multiplicities, weights, 0,
+                      EXACTLENGTH+1)
+    self.assertRaises(ValueError, scoregraph, g, EXACTLENGTH+1, 2013)
+    self.assertRaises(ValueError, IncrementalScorer, g, EXACTLENGTH+1, 2013)
+
+  def test_pathscorer_counts_longer_paths(self):
+    # past EXACTLENGTH, pathscorer must count the paths one by one
+    d = EXACTLENGTH + 1
+    for g in self.graphs(5):
+      n = g.num_vertices()
+      rank = TopRank(n*n)
+      scorerow = pathscorer(g, d)
+      for u in xrange(n-1):
+        scorerow(u, rank)
+      scores = dict(((u, v), score) for score, u, v in rank)
+      distances = DistanceRows(g, d)
+      index = NeighbourhoodIndex(g)
+      for u in xrange(n-1):
+        for v, distance in zip(*distances.candidates(u)):
+          expected = evaluatepair(g, g.vertex(u), g.vertex(int(v)),
+                                  int(distance), d, 2013, index=index)
+          self.assertAlmostEqual(scores[u, int(v)], expected, places=9)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,88 @@
+import numpy as np
+from scipy import sparse
+from profiling import profiled
+
+# the longest path length weightedpathcounts counts exactly
+EXACTLENGTH = 3
+
+
+def dropsources(m, sources):
+  '''Zeroes entry (i, sources[i]) of m, for every row i.'''
+  back = sparse.csr_matrix(
+      (np.ones(len(sources)), (np.arange(len(sources)), sources)),
+      shape=m.shape)
+  m = (m - m.multiply(back)).tocsr()
+  m.eliminate_zeros()
+  return m
+
+def detourcorrection(multiplicities, weights, sources):
+  '''Returns the value of the length 3 walks going s -> t -> y -> t.
+
+  These walks reach the target before their last hop, which
+  countweightedpaths never follows, so they must be taken off the length 3
+  counts. Each one is worth m(s,t) m(t,y)^2 (w(s,t) + 2 w(t,y)).
+  '''
+  squares = multiplicities.multiply(multiplicities)
+  a = np.asarray(squares.sum(axis=1)).ravel()
+  b = np.asarray(squares.multiply(weights).sum(axis=1)).ravel()
+  first = multiplicities[sources].tocoo()
+  rows, targets, m = first.row, first.col, first.data
+  if len(rows) == 0:
+    return sparse.csr_matrix(first.shape)
+  w = np.asarray(weights[sources[rows], targets]).ravel()
+  # y == s was already dropped along with the walks coming back to s
+  detour = m * (w * (a[targets] - m*m) + 2.0 * (b[targets] - m*m*w))
+  return sparse.csr_matrix((detour, (rows, targets)), shape=first.shape)
+
+def checklength(d):
+  '''Raises ValueError unless paths up to length d are counted exactly.'''
+  if d > EXACTLENGTH:
+    raise ValueError("path counts are only exact up to length %d, not %d" %
+                     (EXACTLENGTH, d))
+
+@profiled("paths")
+def weightedpathcounts(multiplicities, weights, sources, d):
+  '''Returns the age-weighted path counts from the sources to every vertex.
+
+  The result is a list indexed by path length: element k, for 2 <= k <= d,
+  is a len(sources) x n CSR matrix whose entry (i, t) is what
+  countweightedpaths(sources[i], t, [], k, 0.0, lastyear) returns, given
+  the matrices built by multiplicitymatrix(g) and decaymatrix(g, lastyear).
+  Elements 0 and 1 are None.
+
+  Instead of enumerating paths, every reached vertex carries how many ways
+  it was reached and the summed weights of those ways, which are pushed
+  one hop further with a sparse product. Each hop costs O(edges) per
+  source, whatever the number of paths.
+
+  Lengths 2 and 3 are exact on loopless graphs. Longer lengths count the
+  walks which never come back to the source, but may repeat other
+  vertices, so they are an upper bound of the simple path counts.
+  '''
+  sources = np.asarray(sources, dtype=np.int64)
+  hopweights = multiplicities.multiply(weights).tocsr()
+  counts = multiplicities[sources]
+  sums = hopweights[sources]
+  paths = [None, None]
+  for length in xrange(2, d+1):
+    counts, sums = counts * multiplicities, sums * multiplicities + counts * hopweights
+    counts = dropsources(counts, sources)
+    sums = dropsources(sums, sources)
+    if length == 3:
+      paths.append((sums - detourcorrection(multiplicities, weights, sources)).tocsr())
+    else:
+      paths.append(sums)
+  return paths
+
+def weightedpathrow(multiplicities, weights, source, d):
+  '''Returns the path counts of length 2..d from source, summed per target.
+
+  The result is a dense array with an entry for every vertex, which is the
+  sum over i in 2..d of countweightedpaths(source, target, [], i, ...).
+  Raises ValueError for d > EXACTLENGTH, where the counts are only bounds.
+  '''
+  checklength(d)
+  row = np.zeros(multiplicities.shape[0])
+  for paths in weightedpathcounts(multiplicities, weights, [source], d)[2:]:
+    row += paths.toarray().ravel()
+  return row